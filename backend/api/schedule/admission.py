@@ -0,0 +1,252 @@
+"""Admission control for schedule generation
+
+Caps how many schedule runs execute at once and how much memory they are
+estimated to need together. Requests that cannot start wait in a bounded
+FIFO queue; when the queue is full (429) or a request waits too long (503)
+it is turned away immediately with a ``Retry-After`` hint instead of
+piling onto the instance.
+
+A request takes its place in line before its memory estimate is
+computed, so a full queue rejects it without any estimation work. While
+waiting, its position can be looked up by ticket id.
+"""
+
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, Optional
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT = int(os.getenv("SCHEDULE_MAX_CONCURRENCY", "2"))
+MAX_QUEUE = int(os.getenv("SCHEDULE_MAX_QUEUE", "8"))
+MEMORY_BUDGET_MB = float(os.getenv("SCHEDULE_MEMORY_BUDGET_MB", "384"))
+QUEUE_TIMEOUT_S = float(os.getenv("SCHEDULE_QUEUE_TIMEOUT_S", "120"))
+
+_TICKET_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is turned away; maps onto an HTTP error"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int,
+                 position: int = 0, ticket_id: Optional[str] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+        self.position = position  # 1-based place in line when turned away
+        self.ticket_id = ticket_id
+
+
+class Ticket:
+    """One admitted or waiting request"""
+
+    __slots__ = ('id', 'cost_mb', 'position', 'enqueued_at', 'future')
+
+    def __init__(self, ticket_id: str, future: asyncio.Future):
+        self.id = ticket_id
+        self.cost_mb: Optional[float] = None  # None while the estimate is being computed
+        self.position = 0  # 1-based place in the wait queue on arrival, 0 if started at once
+        self.enqueued_at = time.monotonic()
+        self.future = future
+
+
+class AdmissionController:
+    """
+    Concurrency + memory-budget gate with a bounded FIFO wait queue.
+
+    A request whose estimate alone exceeds the budget is not rejected: it
+    is admitted when nothing else is running, so it degrades to exclusive
+    execution instead of failing.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT, max_queue: int = MAX_QUEUE,
+                 memory_budget_mb: float = MEMORY_BUDGET_MB, queue_timeout_s: float = QUEUE_TIMEOUT_S):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.memory_budget_mb = memory_budget_mb
+        self.queue_timeout_s = queue_timeout_s
+        self.running = 0
+        self.running_mb = 0.0
+        self.waiting: Deque[Ticket] = deque()
+        self.tickets: Dict[str, Ticket] = {}  # waiting and running, by id
+        self.counters = Counter()
+        self.peak_queue = 0
+        self.avg_run_s = 5.0  # EMA of run time, seeds Retry-After estimates
+
+    @asynccontextmanager
+    async def admit(self, estimate: Callable[[], Awaitable[float]], ticket_id: Optional[str] = None):
+        """
+        Hold a slot for the duration of the block, waiting in line if needed.
+
+        Args:
+            estimate: Coroutine factory returning the request's memory cost
+                in MB; only called once the request has a place in line
+            ticket_id: Caller-chosen id to look the request up while it
+                waits (a fresh one is generated if missing or invalid)
+        """
+        ticket = await self._acquire(estimate, ticket_id)
+        started = time.monotonic()
+        try:
+            yield ticket
+        finally:
+            self._release(ticket, time.monotonic() - started)
+
+    async def _acquire(self, estimate: Callable[[], Awaitable[float]], ticket_id: Optional[str]) -> Ticket:
+        if not ticket_id or not _TICKET_ID.match(ticket_id) or ticket_id in self.tickets:
+            ticket_id = uuid.uuid4().hex[:12]
+
+        # Requests that can start at once do not count against the queue
+        free_slots = max(0, self.max_concurrent - self.running)
+        if len(self.waiting) >= self.max_queue + free_slots:
+            self.counters["rejected_queue_full"] += 1
+            retry_after = self._retry_after(len(self.waiting))
+            logger.warning(f"🚦 Schedule queue full ({len(self.waiting)}), rejecting (retry in {retry_after}s)")
+            raise AdmissionRejected(
+                429,
+                f"Schedule queue is full ({len(self.waiting)} waiting, {self.running} running). Retry later.",
+                retry_after,
+                position=len(self.waiting) + 1,
+                ticket_id=ticket_id,
+            )
+
+        ticket = Ticket(ticket_id, asyncio.get_running_loop().create_future())
+        self.waiting.append(ticket)
+        self.tickets[ticket.id] = ticket
+        try:
+            ticket.cost_mb = await estimate()
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        self._wake()
+        if ticket.future.done():
+            return ticket
+
+        ticket.position = self.position(ticket)
+        self.peak_queue = max(self.peak_queue, len(self.waiting))
+        self.counters["queued"] += 1
+        logger.info(f"🚦 Schedule request {ticket.id} queued at position {ticket.position} (~{ticket.cost_mb:.0f}MB)")
+
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), timeout=self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            if ticket.future.done():
+                # Admitted just as the timeout fired: keep the slot
+                return ticket
+            position = self.position(ticket)
+            self._abandon(ticket)
+            self.counters["rejected_timeout"] += 1
+            raise AdmissionRejected(
+                503,
+                f"Timed out after {self.queue_timeout_s:.0f}s waiting for a schedule slot. Retry later.",
+                self._retry_after(len(self.waiting)),
+                position=position,
+                ticket_id=ticket.id,
+            )
+        except asyncio.CancelledError:
+            # Client went away while waiting
+            if ticket.future.done():
+                self._release(ticket, 0)
+            else:
+                self._abandon(ticket)
+            raise
+        self.counters["wait_seconds"] += time.monotonic() - ticket.enqueued_at
+        return ticket
+
+    def _fits(self, cost_mb: Optional[float]) -> bool:
+        if cost_mb is None or self.running >= self.max_concurrent:
+            return False
+        return self.running == 0 or self.running_mb + cost_mb <= self.memory_budget_mb
+
+    def _start(self, ticket: Ticket) -> Ticket:
+        self.running += 1
+        self.running_mb += ticket.cost_mb
+        self.counters["admitted"] += 1
+        return ticket
+
+    def _release(self, ticket: Ticket, run_seconds: float):
+        self.running -= 1
+        self.running_mb -= ticket.cost_mb
+        self.tickets.pop(ticket.id, None)
+        self.counters["completed"] += 1
+        if run_seconds:
+            self.avg_run_s = 0.8 * self.avg_run_s + 0.2 * run_seconds
+        self._wake()
+
+    def _abandon(self, ticket: Ticket):
+        """Take a ticket that never started out of line"""
+        if ticket in self.waiting:
+            self.waiting.remove(ticket)
+        self.tickets.pop(ticket.id, None)
+        self._wake()
+
+    def _wake(self):
+        """Start waiting requests in FIFO order while they fit"""
+        while self.waiting and self._fits(self.waiting[0].cost_mb):
+            ticket = self.waiting.popleft()
+            if ticket.future.done():
+                continue
+            self._start(ticket)
+            ticket.future.set_result(True)
+
+    def _retry_after(self, queued: int) -> int:
+        waves = (queued + self.running) / self.max_concurrent
+        return max(1, math.ceil(self.avg_run_s * max(waves, 1)))
+
+    def position(self, ticket: Ticket) -> int:
+        """Current 1-based place in line, 0 once running"""
+        try:
+            return self.waiting.index(ticket) + 1
+        except ValueError:
+            return 0
+
+    def status(self, ticket_id: str) -> Optional[Dict]:
+        """Live state of a waiting or running request, or None if unknown"""
+        ticket = self.tickets.get(ticket_id)
+        if ticket is None:
+            return None
+        position = self.position(ticket)
+        if not position:
+            state = "running"
+        elif ticket.cost_mb is None:
+            state = "estimating"
+        else:
+            state = "queued"
+        return {
+            "ticket": ticket.id,
+            "state": state,
+            "position": position,
+            "waited_seconds": round(time.monotonic() - ticket.enqueued_at, 2),
+            "estimated_mb": round(ticket.cost_mb, 1) if ticket.cost_mb is not None else None,
+            "retry_after": self._retry_after(position - 1) if position else 0,
+        }
+
+    def metrics(self) -> Dict:
+        return {
+            "limits": {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "memory_budget_mb": self.memory_budget_mb,
+                "queue_timeout_s": self.queue_timeout_s,
+            },
+            "running": self.running,
+            "running_memory_mb": round(self.running_mb, 1),
+            "queued": len(self.waiting),
+            "waiting": [self.status(ticket.id) for ticket in self.waiting],
+            "peak_queue": self.peak_queue,
+            "avg_run_seconds": round(self.avg_run_s, 2),
+            "counters": {
+                key: round(value, 2) if isinstance(value, float) else value
+                for key, value in self.counters.items()
+            },
+        }
+
+
+admission = AdmissionController()
@@ -0,0 +1,230 @@
+"""Time-budgeted local search over a greedy schedule
+
+Works on room-slot bins (one per ledger key) rather than batch dicts, so
+moving a participant is a list operation and the remaining-capacity ledger
+stays the single source of truth. Every accepted move is non-worsening for
+the objective (PWD off the 1st floor, then days used, then batch count),
+so the current state is always the best one found and the search can stop
+at any moment.
+"""
+
+from collections import Counter
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import random
+
+UsageKey = Tuple[str, int, str]  # (date, slot_idx, room_key), as in the scheduler ledger
+Member = Tuple[int, bool]  # (participant_id, is_pwd)
+
+# Consecutive failed moves after which the search is considered converged
+MAX_STALE_MOVES = 200
+
+
+class LocalSearchOptimizer:
+    """
+    Anytime improvement pass for ``OptimizedScheduler`` results.
+
+    Args:
+        bins: {usage_key: [member, ...]} for every non-empty room-slot (mutated)
+        free: remaining capacity ledger keyed the same way (mutated)
+        first_floor: room keys on the 1st floor
+        prioritize_pwd: keep PWD participants on the 1st floor
+        seed: seed for move selection, for reproducible runs
+    """
+
+    __slots__ = ('bins', 'free', 'first_floor', 'prioritize_pwd', 'rng',
+                 'day_bins', 'displaced', 'stats')
+
+    def __init__(self, bins: Dict[UsageKey, List[Member]], free: Dict[UsageKey, int],
+                 first_floor: Set[str], prioritize_pwd: bool, seed: int = 0):
+        self.bins = bins
+        self.free = free
+        self.first_floor = first_floor
+        self.prioritize_pwd = prioritize_pwd
+        self.rng = random.Random(seed)
+        self.day_bins = Counter(key[0] for key in bins)
+        self.displaced: Set[UsageKey] = {
+            key for key, members in bins.items()
+            if key[2] not in first_floor and any(pwd for _, pwd in members)
+        } if prioritize_pwd else set()
+        self.stats = Counter()
+
+    # ---------------------------------------------------------------- search
+
+    def run(self, budget_seconds: float) -> Dict:
+        """Improve until the budget runs out or no move succeeds any more"""
+        start = perf_counter()
+        deadline = start + budget_seconds
+        before = self.objective()
+
+        moves = [self._relocate_pwd, self._dissolve_batch, self._clear_last_day]
+        stale = 0
+        while stale < MAX_STALE_MOVES and perf_counter() < deadline:
+            move = self.rng.choice(moves)
+            self.stats["attempted"] += 1
+            if move():
+                self.stats[move.__name__.lstrip('_')] += 1
+                stale = 0
+            else:
+                stale += 1
+
+        after = self.objective()
+        return {
+            "elapsed_ms": round((perf_counter() - start) * 1000, 1),
+            "converged": stale >= MAX_STALE_MOVES,
+            "moves": dict(self.stats),
+            "before": dict(zip(("pwd_off_first_floor", "days_used", "batches"), before)),
+            "after": dict(zip(("pwd_off_first_floor", "days_used", "batches"), after)),
+        }
+
+    def objective(self) -> Tuple[int, int, int]:
+        """(PWD off the 1st floor, days used, batches) — lower is better"""
+        pwd_off = sum(
+            sum(1 for _, pwd in self.bins[key] if pwd) for key in self.displaced
+        ) if self.prioritize_pwd else 0
+        return pwd_off, len(self.day_bins), len(self.bins)
+
+    # ----------------------------------------------------------------- moves
+
+    def _relocate_pwd(self) -> bool:
+        """Move a displaced PWD onto a 1st floor room-slot, or swap with a non-PWD there"""
+        if not self.displaced:
+            return False
+        source = self.rng.choice(sorted(self.displaced))
+        members = self.bins[source]
+        pos = next((i for i, (_, pwd) in enumerate(members) if pwd), None)
+        if pos is None:
+            self.displaced.discard(source)
+            return False
+
+        # Free 1st floor seat: existing batches first, then empty room-slots on used days
+        target = next(self._targets(source, self.day_bins.keys(), ff_only=True, allow_new=False), None)
+        if target is None:
+            target = next(self._targets(source, self.day_bins.keys(), ff_only=True, allow_new=True), None)
+        if target is not None:
+            self._move([members[pos]], source, target)
+            return True
+
+        # No free seat: swap with a non-PWD sitting on the 1st floor
+        for key in self._shuffled(k for k in self.bins if k[2] in self.first_floor):
+            other = self.bins[key]
+            swap = next((i for i, (_, pwd) in enumerate(other) if not pwd), None)
+            if swap is not None:
+                members[pos], other[swap] = other[swap], members[pos]
+                self._refresh_displaced(source)
+                return True
+        return False
+
+    def _dissolve_batch(self) -> bool:
+        """Empty one of the least-filled batches into spare seats of existing batches"""
+        if len(self.bins) < 2:
+            return False
+        candidates = sorted(self.bins, key=lambda k: len(self.bins[k]))[:8]
+        source = self.rng.choice(candidates)
+        plan = self._plan(source, self.day_bins.keys(), allow_new=False)
+        if plan is None:
+            return False
+        self._apply(source, plan)
+        return True
+
+    def _clear_last_day(self) -> bool:
+        """Move everything on the last used day into spare capacity on earlier days"""
+        if len(self.day_bins) < 2:
+            return False
+        last_day = max(self.day_bins)
+        earlier = {day for day in self.day_bins if day != last_day}
+        sources = [key for key in self.bins if key[0] == last_day]
+
+        # Plan against a scratch ledger so a partial failure changes nothing
+        saved_free = dict(self.free)
+        plans = []
+        for source in sources:
+            plan = self._plan(source, earlier, allow_new=True)
+            if plan is None:
+                self.free.update(saved_free)
+                return False
+            for target, group in plan:
+                self.free[target] -= len(group)
+            plans.append((source, plan))
+        self.free.update(saved_free)
+
+        for source, plan in plans:
+            self._apply(source, plan)
+        return True
+
+    # --------------------------------------------------------------- helpers
+
+    def _plan(self, source: UsageKey, days, allow_new: bool
+              ) -> Optional[List[Tuple[UsageKey, List[Member]]]]:
+        """Seats for every member of ``source``, or None if they do not all fit"""
+        members = self.bins[source]
+        keep_ff = self.prioritize_pwd and source[2] in self.first_floor
+        pinned = [m for m in members if keep_ff and m[1]]
+        loose = [m for m in members if not (keep_ff and m[1])]
+
+        tentative = Counter()
+        plan = []
+        for group, ff_only in ((pinned, True), (loose, False)):
+            rest = group
+            for prefer_existing in (True, False) if allow_new else (True,):
+                if not rest:
+                    break
+                for target in self._targets(source, days, ff_only, allow_new=not prefer_existing):
+                    room = self.free.get(target, 0) - tentative[target]
+                    if room <= 0:
+                        continue
+                    chunk, rest = rest[:room], rest[room:]
+                    tentative[target] += len(chunk)
+                    plan.append((target, chunk))
+                    if not rest:
+                        break
+            if rest:
+                return None
+        return plan
+
+    def _apply(self, source: UsageKey, plan: List[Tuple[UsageKey, List[Member]]]):
+        for target, group in plan:
+            self._move(group, source, target)
+
+    def _move(self, group: List[Member], source: UsageKey, target: UsageKey):
+        moving = set(pid for pid, _ in group)
+        self.bins[source] = [m for m in self.bins[source] if m[0] not in moving]
+        if target not in self.bins:
+            self.bins[target] = []
+            self.day_bins[target[0]] += 1
+        self.bins[target].extend(group)
+        self.free[source] += len(group)
+        self.free[target] -= len(group)
+
+        if not self.bins[source]:
+            del self.bins[source]
+            self.day_bins[source[0]] -= 1
+            if not self.day_bins[source[0]]:
+                del self.day_bins[source[0]]
+        self._refresh_displaced(source)
+        self._refresh_displaced(target)
+
+    def _refresh_displaced(self, key: UsageKey):
+        if not self.prioritize_pwd or key[2] in self.first_floor:
+            return
+        if any(pwd for _, pwd in self.bins.get(key, ())):
+            self.displaced.add(key)
+        else:
+            self.displaced.discard(key)
+
+    def _targets(self, source: UsageKey, days, ff_only: bool, allow_new: bool) -> Iterator[UsageKey]:
+        """Room-slots with spare seats: existing batches, or empty room-slots if ``allow_new``"""
+        pool = self.free if allow_new else self.bins
+        for key in pool:
+            if key == source or key[0] not in days or self.free.get(key, 0) <= 0:
+                continue
+            if ff_only and key[2] not in self.first_floor:
+                continue
+            if allow_new and key in self.bins:
+                continue
+            yield key
+
+    def _shuffled(self, keys) -> List:
+        keys = list(keys)
+        self.rng.shuffle(keys)
+        return keys
@@ -0,0 +1,291 @@
+"""Cross-event room occupancy index
+
+Keeps, for every (room, date), the already-booked batches as sorted
+interval arrays so the scheduler can subtract seats taken by other
+schedules with a binary search instead of scanning ``schedule_batches``.
+
+Runs that are still being scheduled or persisted hold their seats as a
+reservation (a negative owner) so concurrent runs see them too. Once a
+run's summary row exists its reservation is bound to that summary id:
+from then on the index, not a database read, is the source of truth for
+that schedule, so its rows are never counted twice while they are being
+written.
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import count
+from typing import Callable, Collection, Dict, Iterable, List, Optional, Set, Tuple
+import threading
+import time
+
+
+def room_key(campus: str, building: str, room: str) -> str:
+    """Room identity shared by the scheduler ledger and the index"""
+    return f"{campus}|{building}|{room}"
+
+
+def to_minutes(value: str) -> int:
+    """'HH:MM' or 'HH:MM:SS' → minutes since midnight"""
+    hours, minutes = str(value).split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def is_reservation(owner: Optional[int]) -> bool:
+    """Reservations are tagged with negative tokens, persisted bookings with their summary id"""
+    return owner is not None and owner < 0
+
+
+class _IntervalArray:
+    """Booked intervals of one room on one day, sorted by start minute"""
+
+    __slots__ = ('starts', 'ends', 'seats', 'owners', 'max_span')
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.seats: List[int] = []
+        self.owners: List[Optional[int]] = []
+        self.max_span = 0
+
+    def insert(self, start: int, end: int, seats: int, owner: Optional[int]):
+        pos = bisect_right(self.starts, start)
+        self.starts.insert(pos, start)
+        self.ends.insert(pos, end)
+        self.seats.insert(pos, seats)
+        self.owners.insert(pos, owner)
+        self.max_span = max(self.max_span, end - start)
+
+    def peak(self, start: int, end: int, exclude: Optional[int] = None) -> int:
+        """Highest number of seats in use at any moment of [start, end), not counting owner ``exclude``"""
+        # Anything overlapping must start after (start - max_span) and before end
+        lo = bisect_right(self.starts, start - self.max_span)
+        hi = bisect_left(self.starts, end)
+        events = []
+        for i in range(lo, hi):
+            if self.ends[i] > start and (exclude is None or self.owners[i] != exclude):
+                events.append((max(self.starts[i], start), self.seats[i]))
+                events.append((min(self.ends[i], end), -self.seats[i]))
+        if not events:
+            return 0
+
+        # Releases sort before bookings at the same minute
+        events.sort(key=lambda e: (e[0], e[1]))
+        in_use = peak = 0
+        for _, delta in events:
+            in_use += delta
+            peak = max(peak, in_use)
+        return peak
+
+    def remove_owners(self, owners: Set[int]):
+        self.retain(lambda owner: owner not in owners)
+
+    def retain(self, keep_owner: Callable[[Optional[int]], bool]):
+        keep = [i for i, owner in enumerate(self.owners) if keep_owner(owner)]
+        self.starts = [self.starts[i] for i in keep]
+        self.ends = [self.ends[i] for i in keep]
+        self.seats = [self.seats[i] for i in keep]
+        self.owners = [self.owners[i] for i in keep]
+        self.max_span = max((e - s for s, e in zip(self.starts, self.ends)), default=0)
+
+    def retag(self, old: Optional[int], new: Optional[int]):
+        self.owners = [new if owner == old else owner for owner in self.owners]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+class RoomOccupancyIndex:
+    """
+    Booked seats per room, per day, as sorted interval arrays.
+
+    Bookings are tagged with their ``schedule_summary_id`` so deleted
+    schedules can be dropped, or with a reservation token while their run
+    is in flight. ``loaded_days`` maps each date read from the database to
+    when the read started. Reloading a day replaces the bookings of
+    schedules written elsewhere; reservations and schedules written by
+    this process (bound or confirmed) keep their own bookings, and their
+    database rows are skipped.
+    """
+
+    __slots__ = ('_rooms', '_summaries', '_tokens', '_bound', '_written', 'loaded_days', 'lock')
+
+    def __init__(self):
+        self._rooms: Dict[Tuple[str, str], _IntervalArray] = {}
+        self._summaries: Dict[Optional[int], Set[Tuple[str, str]]] = {}
+        self._tokens = count(-1, -1)
+        self._bound: Dict[int, int] = {}  # reservation token -> summary id it is being persisted as
+        self._written: Set[int] = set()  # summaries persisted by this process, booked here already
+        self.loaded_days: Dict[str, float] = {}
+        self.lock = threading.RLock()
+
+    def add(self, key: str, day: str, start: int, end: int, seats: int,
+            summary_id: Optional[int] = None):
+        """Book ``seats`` in room ``key`` on ``day`` for [start, end) minutes"""
+        if seats <= 0 or end <= start:
+            return
+        with self.lock:
+            slot_key = (key, day)
+            intervals = self._rooms.get(slot_key)
+            if intervals is None:
+                intervals = self._rooms[slot_key] = _IntervalArray()
+            intervals.insert(start, end, seats, summary_id)
+            self._summaries.setdefault(summary_id, set()).add(slot_key)
+
+    def add_batch(self, batch: Dict, summary_id: Optional[int] = None):
+        """Book a schedule_batches row (or a batch dict from the scheduler)"""
+        self.add(
+            room_key(batch.get("campus"), batch.get("building"), batch.get("room")),
+            str(batch["batch_date"])[:10],
+            to_minutes(batch["start_time"]),
+            to_minutes(batch["end_time"]),
+            int(batch.get("participant_count") or 0),
+            summary_id if summary_id is not None else batch.get("schedule_summary_id"),
+        )
+
+    def reservation(self) -> int:
+        """New reservation token, for runs that book their batches one at a time"""
+        with self.lock:
+            return next(self._tokens)
+
+    def reserve(self, batches: Iterable[Dict]) -> int:
+        """Hold the seats of batches that are not persisted yet; returns the reservation token"""
+        with self.lock:
+            token = self.reservation()
+            for batch in batches:
+                self.add_batch(batch, token)
+            return token
+
+    def bind(self, token: int, summary_id: int):
+        """
+        The reserved batches are about to be persisted as ``summary_id``.
+
+        Call it before the first batch row is written: database reads then
+        skip that schedule, since the reservation already counts its seats.
+        """
+        with self.lock:
+            self._bound[token] = summary_id
+            self._written.add(summary_id)
+
+    def confirm(self, token: int, summary_id: int):
+        """The reserved batches were persisted as ``summary_id``"""
+        with self.lock:
+            self._bound.pop(token, None)
+            self._written.add(summary_id)
+            slot_keys = self._summaries.pop(token, set())
+            for slot_key in slot_keys:
+                self._rooms[slot_key].retag(token, summary_id)
+            if slot_keys:
+                self._summaries.setdefault(summary_id, set()).update(slot_keys)
+
+    def release(self, token: int):
+        """Give back the seats of a run that failed before persisting"""
+        with self.lock:
+            summary_id = self._bound.pop(token, None)
+            if summary_id is not None:
+                self._written.discard(summary_id)
+            self.discard_summaries({token})
+
+    def stale_days(self, days: Iterable[str], max_age_s: float) -> List[str]:
+        """Days never read from the database, or read more than ``max_age_s`` ago"""
+        now = time.monotonic()
+        with self.lock:
+            return [
+                day for day in days
+                if day not in self.loaded_days or now - self.loaded_days[day] > max_age_s
+            ]
+
+    def replace_days(self, days: Collection[str], batches: Iterable[Dict], read_at: Optional[float] = None):
+        """
+        Swap the bookings of ``days`` held by schedules written elsewhere
+        for a fresh database read.
+
+        Args:
+            days: Dates covered by the read
+            batches: schedule_batches rows read for those dates
+            read_at: ``time.monotonic()`` taken before the read started;
+                days refreshed by a newer read since then are left alone
+        """
+        if read_at is None:
+            read_at = time.monotonic()
+        with self.lock:
+            days = {day for day in days if self.loaded_days.get(day, float("-inf")) < read_at}
+            if not days:
+                return
+
+            def local(owner: Optional[int]) -> bool:
+                return is_reservation(owner) or owner in self._written
+
+            for slot_key in [k for k in self._rooms if k[1] in days]:
+                intervals = self._rooms[slot_key]
+                intervals.retain(local)
+                if not intervals:
+                    del self._rooms[slot_key]
+            for sid in [sid for sid in self._summaries if not local(sid)]:
+                slot_keys = {k for k in self._summaries[sid] if k[1] not in days}
+                if slot_keys:
+                    self._summaries[sid] = slot_keys
+                else:
+                    del self._summaries[sid]
+
+            for batch in batches:
+                if str(batch["batch_date"])[:10] in days and batch.get("schedule_summary_id") not in self._written:
+                    self.add_batch(batch)
+            for day in days:
+                self.loaded_days[day] = read_at
+
+    def booked(self, key: str, day: str, start: int, end: int, exclude: Optional[int] = None) -> int:
+        """Seats already taken in room ``key`` during [start, end) on ``day``, besides reservation ``exclude``"""
+        with self.lock:
+            intervals = self._rooms.get((key, day))
+            return intervals.peak(start, end, exclude) if intervals else 0
+
+    def swap(self, token: int, batches: List[Dict], capacities: Optional[Dict[str, int]] = None) -> bool:
+        """
+        Replace the seats held by reservation ``token`` with ``batches``.
+
+        With ``capacities`` (room key -> seats) the swap only happens if
+        every batch still fits next to the other bookings; returns whether
+        it did.
+        """
+        with self.lock:
+            if capacities is not None:
+                for batch in batches:
+                    key = room_key(batch["campus"], batch["building"], batch["room"])
+                    taken = self.booked(
+                        key, str(batch["batch_date"])[:10],
+                        to_minutes(batch["start_time"]), to_minutes(batch["end_time"]), exclude=token
+                    )
+                    if taken + int(batch.get("participant_count") or 0) > capacities.get(key, 0):
+                        return False
+            self.discard_summaries({token})
+            for batch in batches:
+                self.add_batch(batch, token)
+            return True
+
+    def summary_ids(self, days: Optional[Collection[str]] = None) -> Set[int]:
+        """Persisted schedules holding seats in the index, optionally only those on ``days``"""
+        with self.lock:
+            return {
+                sid for sid, slot_keys in self._summaries.items()
+                if sid is not None and not is_reservation(sid)
+                and (days is None or any(day in days for _, day in slot_keys))
+            }
+
+    def discard_summaries(self, summary_ids: Set[int]):
+        """Drop bookings of schedules that no longer exist"""
+        if not summary_ids:
+            return
+        with self.lock:
+            self._written -= summary_ids
+            touched = set()
+            for sid in summary_ids:
+                touched |= self._summaries.pop(sid, set())
+            for slot_key in touched:
+                intervals = self._rooms[slot_key]
+                intervals.remove_owners(summary_ids)
+                if not intervals:
+                    del self._rooms[slot_key]
+
+    def __len__(self) -> int:
+        with self.lock:
+            return sum(len(intervals) for intervals in self._rooms.values())
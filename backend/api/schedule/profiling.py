@@ -0,0 +1,250 @@
+"""On-demand profiling of schedule runs
+
+A run is profiled when an admin request carries ``X-Profile`` or when the
+admin toggle is on. Two capture modes:
+
+- ``sample``: a background thread samples the stacks of the profiled
+  request thread and of the threads it hands work to (registered with
+  ``follow``, e.g. the streaming pipeline threads), so concurrent
+  requests never leak into the profile. Stored as speedscope JSON.
+- ``cprofile``: deterministic ``cProfile`` of the request thread. Stored
+  as a pstats dump (``python -m pstats``, snakeviz, ...).
+
+Profiles are written to ``SCHEDULE_PROFILE_DIR`` with a JSON metadata
+sidecar; only the newest ``SCHEDULE_PROFILE_RETENTION`` are kept.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+import cProfile
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path(os.getenv("SCHEDULE_PROFILE_DIR", Path(__file__).parent.parent.parent / ".profiles"))
+PROFILE_RETENTION = int(os.getenv("SCHEDULE_PROFILE_RETENTION", "20"))
+SAMPLE_INTERVAL_MS = float(os.getenv("SCHEDULE_PROFILE_INTERVAL_MS", "5"))
+
+MODES = ("sample", "cprofile")
+FILE_SUFFIX = {"sample": ".speedscope.json", "cprofile": ".pstats"}
+
+_PROFILE_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Admin toggle: profile every schedule run while enabled
+state = {"enabled": False, "mode": "sample"}
+_state_lock = threading.Lock()
+
+# Sampler of the capture running on the current thread, if any
+_active = threading.local()
+
+
+def set_enabled(enabled: bool, mode: str = "sample") -> Dict:
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiling mode '{mode}', expected one of {MODES}")
+    with _state_lock:
+        state["enabled"] = enabled
+        state["mode"] = mode
+        return dict(state)
+
+
+def requested_mode(header: Optional[str], authorized: bool = False) -> Optional[str]:
+    """
+    Capture mode for a request: the X-Profile header wins over the admin
+    toggle, but only when the caller is ``authorized`` as an admin.
+    """
+    if header and authorized:
+        value = header.strip().lower()
+        if value in ("0", "false", "off", "no"):
+            return None
+        if value in ("cprofile", "pstats", "deterministic"):
+            return "cprofile"
+        return "sample"
+    with _state_lock:
+        return state["mode"] if state["enabled"] else None
+
+
+class _Sampler(threading.Thread):
+    """Periodic stack sampler aggregating identical stacks per thread, for the thread idents in ``threads``"""
+
+    def __init__(self, interval_ms: float):
+        super().__init__(name="schedule-profiler", daemon=True)
+        self.interval = interval_ms / 1000
+        self.threads: Set[int] = set()
+        self.frames: Dict[Tuple[str, str, int], int] = {}
+        self.stacks: Dict[str, Counter] = {}
+        self.sample_count = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            frames = sys._current_frames()
+            for ident in tuple(self.threads):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_id(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.stacks.setdefault(names.get(ident, str(ident)), Counter())[tuple(stack)] += 1
+            self.sample_count += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        idx = self.frames.get(key)
+        if idx is None:
+            idx = self.frames[key] = len(self.frames)
+        return idx
+
+    def to_speedscope(self, name: str) -> Dict:
+        interval_ms = self.interval * 1000
+        profiles = []
+        for thread_name, stacks in self.stacks.items():
+            samples = [list(stack) for stack in stacks]
+            weights = [count * interval_ms for count in stacks.values()]
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "cla-scheduler-profiler",
+            "shared": {
+                "frames": [
+                    {"name": fn, "file": file, "line": line}
+                    for (fn, file, line), _ in sorted(self.frames.items(), key=lambda item: item[1])
+                ]
+            },
+            "profiles": profiles,
+        }
+
+
+@contextmanager
+def capture(label: str, mode: str):
+    """
+    Profile the enclosed block and store the result.
+
+    Yields a metadata dict that is filled in (``id``, ``file``...) once the
+    block exits; storage failures are logged and never fail the request.
+    """
+    meta = {
+        "id": f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}",
+        "label": label,
+        "mode": mode,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    profiler = cProfile.Profile() if mode == "cprofile" else None
+    sampler = _Sampler(SAMPLE_INTERVAL_MS) if mode == "sample" else None
+
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    if sampler:
+        sampler.threads.add(threading.get_ident())
+        _active.sampler = sampler
+        sampler.start()
+    try:
+        yield meta
+    finally:
+        if profiler:
+            profiler.disable()
+        if sampler:
+            _active.sampler = None
+            sampler.stop()
+        meta["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        try:
+            _store(meta, profiler, sampler)
+        except Exception as e:
+            logger.error(f"❌ Failed to store profile {meta['id']}: {e}")
+
+
+def call(label: str, mode: Optional[str], fn, *args):
+    """
+    Run ``fn(*args)`` on the current thread, profiled when ``mode`` is set.
+
+    Returns:
+        (result, profile id or None)
+    """
+    if not mode:
+        return fn(*args), None
+    with capture(label, mode) as meta:
+        return fn(*args), meta["id"]
+
+
+def follow(thread: threading.Thread):
+    """
+    Sample ``thread`` along with the current thread's capture, if one is
+    running. Call it from the profiled thread, after ``thread.start()``.
+    """
+    sampler = getattr(_active, "sampler", None)
+    if sampler is not None and thread.ident is not None:
+        sampler.threads.add(thread.ident)
+
+
+def _store(meta: Dict, profiler: Optional[cProfile.Profile], sampler: Optional[_Sampler]):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    path = PROFILE_DIR / f"{meta['id']}{FILE_SUFFIX[meta['mode']]}"
+    if profiler:
+        profiler.dump_stats(str(path))
+    else:
+        meta["samples"] = sampler.sample_count
+        path.write_text(json.dumps(sampler.to_speedscope(meta["label"])))
+    meta["file"] = path.name
+    meta["size_bytes"] = path.stat().st_size
+    (PROFILE_DIR / f"{meta['id']}.meta.json").write_text(json.dumps(meta))
+    logger.info(f"🔬 Stored {meta['mode']} profile {meta['id']} ({meta['duration_ms']}ms)")
+    _enforce_retention()
+
+
+def _enforce_retention():
+    for meta in list_profiles()[PROFILE_RETENTION:]:
+        for name in (meta.get("file"), f"{meta['id']}.meta.json"):
+            if name:
+                (PROFILE_DIR / name).unlink(missing_ok=True)
+
+
+def list_profiles() -> List[Dict]:
+    """Stored profile metadata, newest first"""
+    if not PROFILE_DIR.exists():
+        return []
+    profiles = []
+    for meta_path in PROFILE_DIR.glob("*.meta.json"):
+        try:
+            profiles.append(json.loads(meta_path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda m: m["id"], reverse=True)
+
+
+def profile_path(profile_id: str) -> Optional[Tuple[Path, Dict]]:
+    """File and metadata of a stored profile, or None"""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    meta_path = PROFILE_DIR / f"{profile_id}.meta.json"
+    if not meta_path.exists():
+        return None
+    meta = json.loads(meta_path.read_text())
+    path = PROFILE_DIR / meta["file"]
+    return (path, meta) if path.exists() else None
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Set
+from fastapi import APIRouter, HTTPException, Header, Response
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Set, Iterable, Iterator, Callable, Tuple
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -8,7 +9,19 @@ from supabase import create_client, Client
 import logging
 from datetime import datetime, timedelta, date
 import asyncio
+import queue
+import threading
+import hmac
+import time
+from itertools import islice
 from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from .occupancy import RoomOccupancyIndex, to_minutes
+from .local_search import LocalSearchOptimizer
+from . import profiling
+from . import snapshot_cache
+from .admission import admission, AdmissionRejected
 
 logger = logging.getLogger(__name__)
 
@@ -41,8 +54,49 @@ sb: Client = create_client(
     SUPABASE_KEY,
 )
 
-# Thread pool for parallel operations (reduced to prevent exhaustion)
-executor = ThreadPoolExecutor(max_workers=2)
+# Thread pool for schedule runs, sized to the admission concurrency limit
+executor = ThreadPoolExecutor(max_workers=admission.max_concurrent)
+
+# Per-table version queries of schedule reads, issued side by side
+version_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="schedule-version")
+
+# Rough resident-memory model used for admission (bytes)
+MEMORY_PER_PARTICIPANT = 2048  # assignment dict, batch id list and insert payload
+MEMORY_PER_LEDGER_ENTRY = 256  # one (date, slot, room) capacity entry
+MEMORY_BASE_MB = 16
+
+# Column projections: only what the scheduler actually reads
+PARTICIPANT_COLUMNS = "id,is_pwd"
+ROOM_COLUMNS = "campus,building,room,capacity"
+OCCUPANCY_COLUMNS = "schedule_summary_id,campus,building,room,batch_date,start_time,end_time,participant_count"
+
+# Shared secret for admin endpoints and X-Profile (X-Admin-Token); both are disabled without it
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Upper bound for the optional local-search pass, whatever the request asks for
+OPTIMIZE_MAX_BUDGET_MS = int(os.getenv("SCHEDULE_OPTIMIZE_MAX_BUDGET_MS", "30000"))
+
+# Furthest /schedule/precheck looks ahead for the earliest end date
+PRECHECK_MAX_DAYS = 366
+
+# Most events accepted by one POST /schedule/batch
+MAX_BATCH_EVENTS = int(os.getenv("SCHEDULE_MAX_BATCH_EVENTS", "20"))
+
+# Seats already booked by persisted schedules, shared by every run in this process
+occupancy_index = RoomOccupancyIndex()
+
+# Days in the occupancy index are re-read after this long, to pick up other writers
+OCCUPANCY_REFRESH_S = float(os.getenv("SCHEDULE_OCCUPANCY_REFRESH_S", "300"))
+
+# One run at a time builds its ledger from the occupancy index and reserves its seats
+# there, so concurrent runs never book the same room-slot. Fetching happens before
+# and persisting after, outside the lock; streaming runs take it once per batch.
+booking_lock = threading.Lock()
+
+# Streaming pipeline limits: memory is bounded by these, not by cohort size
+STREAM_PAGE_BUFFER = int(os.getenv("SCHEDULE_STREAM_PAGE_BUFFER", "2"))  # participant pages held ahead of the scheduler
+STREAM_BATCH_QUEUE = int(os.getenv("SCHEDULE_STREAM_BATCH_QUEUE", "256"))  # batches waiting for the writer
+STREAM_FLUSH_BATCHES = int(os.getenv("SCHEDULE_STREAM_FLUSH_BATCHES", "50"))  # batches per insert round-trip
 
 # ==================== Models ====================
 
@@ -62,6 +116,9 @@ class ScheduleRequest(BaseModel):
     exclude_lunch_break: bool = True
     lunch_break_start: str = "12:00"
     lunch_break_end: str = "13:00"
+    streaming: bool = False  # Overlap fetch → schedule → persist with bounded memory
+    avoid_conflicts: bool = True  # Subtract seats other schedules already hold in each room-slot
+    optimize_budget_ms: int = 0  # Wall-clock budget for the local-search pass (0 = greedy only)
 
 class ScheduleResponse(BaseModel):
     schedule_summary_id: int
@@ -71,23 +128,78 @@ class ScheduleResponse(BaseModel):
     warnings: List[str] = []
     pwd_stats: Dict = {}
     execution_time: float = 0
+    optimization: Dict = {}
+
+class BatchScheduleRequest(BaseModel):
+    events: List[ScheduleRequest]
+    avoid_conflicts: bool = True  # Also respect seats booked by already persisted schedules
+
+class BatchScheduleResponse(BaseModel):
+    results: List[Dict] = []  # ScheduleResponse fields, or event_name + error, per event in order
+    scheduled_events: int = 0
+    failed_events: int = 0
+    warnings: List[str] = []
+    execution_time: float = 0
+
+class PrecheckRequest(BaseModel):
+    start_date: str
+    end_date: str
+    start_time: str
+    end_time: str
+    duration_per_batch: int
+    campus_group_id: int
+    participant_group_id: int
+    prioritize_pwd: bool = True
+    exclude_lunch_break: bool = True
+    lunch_break_start: str = "12:00"
+    lunch_break_end: str = "13:00"
+    avoid_conflicts: bool = True  # Net of seats other schedules hold, as /schedule does by default
+
+class HorizonRequest(BaseModel):
+    start_date: str
+    end_date: Optional[str] = None  # Given: find the fewest slots per day instead of the end date
+    start_time: str
+    end_time: str
+    duration_per_batch: int
+    campus_group_id: int
+    participant_group_id: int
+    prioritize_pwd: bool = True
+    exclude_lunch_break: bool = True
+    lunch_break_start: str = "12:00"
+    lunch_break_end: str = "13:00"
+    avoid_conflicts: bool = True
+    max_days: int = Field(PRECHECK_MAX_DAYS, ge=1, le=PRECHECK_MAX_DAYS)  # Furthest end date searched
+
+class ProfilingToggle(BaseModel):
+    enabled: bool
+    mode: str = "sample"  # "sample" (speedscope) or "cprofile" (pstats)
 
 # ==================== Helper Functions ====================
 
-def fetch_all_paginated(table: str, filter_column: str, filter_value: any) -> List[Dict]:
+def iter_paginated(
+    table: str,
+    filter_column: str,
+    filter_value: any,
+    query_filter: Optional[Callable] = None,
+    columns: str = "*",
+    strict: bool = False
+) -> Iterator[List[Dict]]:
     """
-    Fetch all rows from a table with pagination to avoid row limits.
+    Yield rows from a table one page at a time.
     
     Args:
         table: Table name to query
-        filter_column: Column to filter by
+        filter_column: Column to filter by (None for no equality filter)
         filter_value: Value to filter on
+        query_filter: Optional callable applying extra filters to the query
+        columns: Comma-separated columns to select
+        strict: Raise on a failed page instead of stopping early, for
+            callers that must not act on a partial read
     
-    Returns:
-        List of all matching rows
+    Yields:
+        Lists of up to PAGE_SIZE rows
     """
     PAGE_SIZE = 1000
-    all_data = []
     page = 0
     
     while True:
@@ -95,31 +207,201 @@ def fetch_all_paginated(table: str, filter_column: str, filter_value: any) -> Li
         end = start + PAGE_SIZE - 1
         
         try:
-            response = sb.table(table)\
-                .select("*")\
-                .eq(filter_column, filter_value)\
-                .range(start, end)\
-                .execute()
-            
-            if not response.data:
-                break
-            
-            all_data.extend(response.data)
-            
-            # If we got less than PAGE_SIZE rows, we've reached the end
-            if len(response.data) < PAGE_SIZE:
-                break
-            
-            page += 1
-            
+            query = sb.table(table).select(columns)
+            if filter_column is not None:
+                query = query.eq(filter_column, filter_value)
+            if query_filter:
+                query = query_filter(query)
+            response = query.range(start, end).execute()
         except Exception as e:
             logger.error(f"❌ Error fetching {table} page {page}: {e}")
+            if strict:
+                raise
             break
+        
+        if not response.data:
+            break
+        
+        yield response.data
+        
+        # If we got less than PAGE_SIZE rows, we've reached the end
+        if len(response.data) < PAGE_SIZE:
+            break
+        
+        page += 1
+
+def fetch_all_paginated(table: str, filter_column: str, filter_value: any, columns: str = "*") -> List[Dict]:
+    """
+    Fetch all rows from a table with pagination to avoid row limits.
+    
+    Args:
+        table: Table name to query
+        filter_column: Column to filter by
+        filter_value: Value to filter on
+        columns: Comma-separated columns to select
+    
+    Returns:
+        List of all matching rows
+    """
+    all_data = []
+    for page in iter_paginated(table, filter_column, filter_value, columns=columns):
+        all_data.extend(page)
     
     logger.info(f"✅ Fetched {len(all_data)} rows from {table}")
     return all_data
 
-def batch_insert(table: str, data: List[Dict], batch_size: int = 500) -> List[int]:
+def count_rows(
+    table: str,
+    filter_column: str,
+    filter_value: any,
+    query_filter: Optional[Callable] = None
+) -> int:
+    """Exact row count computed by the database, without downloading rows"""
+    query = sb.table(table)\
+        .select("id", count="exact")\
+        .eq(filter_column, filter_value)
+    if query_filter:
+        query = query_filter(query)
+    response = query.limit(1).execute()
+    return response.count or 0
+
+def pwd_only(query):
+    """Restrict a participants query to PWD rows"""
+    return query.eq("is_pwd", True)
+
+def non_pwd_only(query):
+    """Restrict a participants query to non-PWD rows (NULL counts as non-PWD)"""
+    return query.or_("is_pwd.is.null,is_pwd.eq.false")
+
+def load_occupancy(start_date: str, end_date: str) -> RoomOccupancyIndex:
+    """
+    Bring the shared occupancy index up to date for a date range.
+    
+    Only schedules holding seats on these days are checked for deletion,
+    and only days never loaded (or older than OCCUPANCY_REFRESH_S) are
+    read from ``schedule_batches``; in between, runs in this process keep
+    the index current through their reservations. Reads happen outside
+    the index lock, so bookings and ledger builds never wait on Supabase.
+    """
+    try:
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        return occupancy_index
+    days = [(start_dt + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((end_dt - start_dt).days + 1)]
+    
+    held = sorted(occupancy_index.summary_ids(set(days)))
+    if held:
+        existing = set()
+        try:
+            for i in range(0, len(held), 200):
+                response = sb.table("schedule_summary").select("id").in_("id", held[i:i + 200]).execute()
+                existing.update(row["id"] for row in response.data or [])
+        except Exception as e:
+            # Keep the bookings: over-counting seats is safe, double-booking is not
+            logger.warning(f"⚠️ Could not check for deleted schedules: {e}")
+        else:
+            occupancy_index.discard_summaries(set(held) - existing)
+    
+    stale = occupancy_index.stale_days(days, OCCUPANCY_REFRESH_S)
+    if stale:
+        read_at = time.monotonic()
+        batches = [
+            batch
+            for page in iter_paginated(
+                "schedule_batches", None, None,
+                query_filter=lambda q: q.gte("batch_date", stale[0]).lte("batch_date", stale[-1]),
+                columns=OCCUPANCY_COLUMNS,
+                strict=True
+            )
+            for batch in page
+        ]
+        occupancy_index.replace_days(stale, batches, read_at)
+        logger.info(f"🔒 Loaded {len(batches)} booked batches for {len(stale)} days into occupancy index")
+    
+    return occupancy_index
+
+def improve_reserved(scheduler: "OptimizedScheduler", result: Dict, budget_ms: int, reservation: int,
+                     ledger: Optional[RoomOccupancyIndex]):
+    """
+    Local-search pass for a greedy schedule whose batches are already
+    reserved, run without holding ``booking_lock``.
+    
+    The improved batches replace the reservation only if they still fit
+    next to what ``ledger`` (the occupancy the run was scheduled against,
+    None for none) booked in the meantime; otherwise the greedy batches stay.
+    """
+    capacities = scheduler.room_capacities()
+    
+    def accept(batches: List[Dict]) -> bool:
+        with booking_lock:
+            if ledger is not None and not ledger.swap(reservation, batches, capacities):
+                return False
+            if ledger is not occupancy_index:
+                occupancy_index.swap(reservation, batches)
+            return True
+    
+    result["optimization"] = scheduler.improve(min(budget_ms, OPTIMIZE_MAX_BUDGET_MS), reservation, accept)
+    result["batches"] = scheduler.batches
+    result["total_batches"] = len(scheduler.batches)
+
+class _StreamError:
+    """Carries an exception from a producer thread to the consuming side"""
+    __slots__ = ('error',)
+    
+    def __init__(self, error: BaseException):
+        self.error = error
+
+_STREAM_DONE = object()
+
+def prefetch(iterable: Iterable, maxsize: int) -> Iterator:
+    """
+    Drain ``iterable`` on a background thread, keeping at most ``maxsize``
+    items buffered ahead of the consumer.
+    
+    Closing the returned generator stops the producer at its next put.
+    """
+    buffer = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_StreamError(e))
+        finally:
+            put(_STREAM_DONE)
+    
+    def consume():
+        producer = threading.Thread(target=produce, name="schedule-prefetch", daemon=True)
+        producer.start()
+        profiling.follow(producer)
+        try:
+            while True:
+                item = buffer.get()
+                if item is _STREAM_DONE:
+                    return
+                if isinstance(item, _StreamError):
+                    raise item.error
+                yield item
+        finally:
+            stop.set()
+    
+    return consume()
+
+def batch_insert(table: str, data: List[Dict], batch_size: int = 500,
+                 returned: Optional[List[Dict]] = None) -> List[int]:
     """
     Insert data in batches to avoid payload limits.
     
@@ -127,6 +409,7 @@ def batch_insert(table: str, data: List[Dict], batch_size: int = 500) -> List[in
         table: Table name
         data: List of records to insert
         batch_size: Number of records per batch
+        returned: Optional list collecting the inserted rows as stored
     
     Returns:
         List of failed batch indices
@@ -146,6 +429,8 @@ def batch_insert(table: str, data: List[Dict], batch_size: int = 500) -> List[in
                 failed_batches.append(batch_num)
             else:
                 logger.info(f"✅ Inserted batch {batch_num}/{total_batches} ({len(chunk)} records)")
+                if returned is not None:
+                    returned.extend(response.data)
                 
         except Exception as e:
             logger.error(f"❌ Batch {batch_num}/{total_batches} failed: {e}")
@@ -179,14 +464,65 @@ def is_first_floor(building: str, room: str) -> bool:
     indicators = {'1f', '1st', 'first', 'ground', 'gf', 'g floor', 'level 1', 'l1', 'floor 1'}
     return any(ind in combined for ind in indicators)
 
+class ParticipantArrays:
+    """
+    Compact participant columns: int64 IDs plus a boolean PWD mask.
+    
+    Replaces full row dicts inside the scheduler; slicing returns views,
+    so phases and batches never copy participant data.
+    """
+    
+    __slots__ = ('ids', 'pwd')
+    
+    def __init__(self, ids: np.ndarray, pwd: np.ndarray):
+        self.ids = ids
+        self.pwd = pwd
+    
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> "ParticipantArrays":
+        ids = np.fromiter((r["id"] for r in rows), dtype=np.int64, count=len(rows))
+        pwd = np.fromiter((bool(r.get("is_pwd")) for r in rows), dtype=bool, count=len(rows))
+        return cls(ids, pwd)
+    
+    @classmethod
+    def from_pages(cls, pages: Iterable[List[Dict]]) -> "ParticipantArrays":
+        """Build from paginated rows, converting page by page"""
+        chunks = [cls.from_rows(page) for page in pages]
+        if not chunks:
+            return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=bool))
+        return cls(
+            np.concatenate([c.ids for c in chunks]),
+            np.concatenate([c.pwd for c in chunks])
+        )
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __getitem__(self, key) -> "ParticipantArrays":
+        return ParticipantArrays(self.ids[key], self.pwd[key])
+
+def fetch_participants(participant_group_id: int) -> ParticipantArrays:
+    """Fetch a participant group as compact arrays (id + is_pwd only)"""
+    participants = ParticipantArrays.from_pages(
+        iter_paginated("participants", "upload_group_id", participant_group_id, columns=PARTICIPANT_COLUMNS)
+    )
+    logger.info(f"✅ Fetched {len(participants)} rows from participants")
+    return participants
+
 class OptimizedScheduler:
     """Ultra-fast scheduler with O(n) complexity and batch processing"""
     
     __slots__ = ('batches', 'scheduled_ids', 'batch_no', 'warnings', 
                  'room_cache', 'slot_cache', 'assignments', 'batch_assignments_map',
-                 'room_slot_usage')  # ✅ NEW: Track room usage per slot
+                 'room_slot_usage',  # ✅ NEW: Track room usage per slot
+                 'sink', 'streamed_count', 'occupancy', 'claim', 'layout')
     
-    def __init__(self):
+    def __init__(
+        self,
+        sink: Optional[Callable[[Dict, List[Dict]], None]] = None,
+        occupancy: Optional[RoomOccupancyIndex] = None,
+        claim: Optional[Callable[[Dict, Dict, str, int], int]] = None
+    ):
         self.batches: List[Dict] = []
         self.scheduled_ids: Set[int] = set()
         self.batch_no = 1
@@ -196,11 +532,16 @@ class OptimizedScheduler:
         self.assignments = []
         self.batch_assignments_map = {}
         self.room_slot_usage = {}  # ✅ NEW: {(date, slot_idx, room_key): remaining_capacity}
+        self.sink = sink  # Streaming mode: receives (batch, assignments) instead of keeping them
+        self.streamed_count = 0
+        self.occupancy = occupancy  # Seats booked by other schedules, subtracted from the ledger
+        self.claim = claim  # Streaming mode: (room, slot, day, seats) -> seats actually booked
+        self.layout = None  # (first_floor_rooms, all_rooms, slots, prioritize_pwd) of the last schedule(), for improve()
     
     def schedule(
         self,
         rooms: List[Dict],
-        participants: List[Dict],
+        participants,
         start_date: str,
         end_date: str,
         start_time: str,
@@ -211,60 +552,25 @@ class OptimizedScheduler:
         lunch_break_start: str = "12:00",
         lunch_break_end: str = "13:00"
     ) -> Dict:
-        """Main scheduling algorithm - FULLY FIXED"""
+        """Main scheduling algorithm - FULLY FIXED
+        
+        ``participants`` may be row dicts or ``ParticipantArrays``. The
+        greedy result can be refined afterwards with ``improve``.
+        """
         
         start_exec = datetime.now()
+        if not isinstance(participants, ParticipantArrays):
+            participants = ParticipantArrays.from_rows(participants)
         logger.info(f"🎯 Starting scheduling for {len(participants)} participants")
         
-        # Pre-process and cache rooms
-        first_floor_rooms, all_rooms = self._process_rooms(rooms)
-        
-        # ✅ NEW: Initialize room usage tracking
-        dates = self._generate_dates(start_date, end_date)
-        if not dates:
-            logger.error("❌ No valid dates generated")
-            return self._empty_result(len(participants))
-        
-        slots = self._generate_slots(
-            start_time, end_time, duration_per_batch,
-            exclude_lunch_break, lunch_break_start, lunch_break_end
+        prepared = self._prepare(
+            rooms, len(participants), start_date, end_date, start_time, end_time,
+            duration_per_batch, exclude_lunch_break, lunch_break_start, lunch_break_end
         )
-        
-        if not slots:
-            logger.error("❌ No valid time slots generated")
-            return self._empty_result(len(participants))
-        
-        # ✅ NEW: Initialize room capacity tracking for each slot
-        for day in dates:
-            day_str = day.strftime("%Y-%m-%d")
-            for slot_idx in range(len(slots)):
-                for room in all_rooms:
-                    room_key = f"{room['campus']}|{room['building']}|{room['room']}"
-                    usage_key = (day_str, slot_idx, room_key)
-                    self.room_slot_usage[usage_key] = room.get('_capacity', 0)
-        
-        # Calculate capacity
-        total_room_capacity = sum(room.get('_capacity', 0) for room in all_rooms)
-        total_slots = len(dates) * len(slots)
-        total_capacity = total_room_capacity * total_slots
-        
-        logger.info(f"📊 CAPACITY ANALYSIS:")
-        logger.info(f"   📅 Days: {len(dates)}")
-        logger.info(f"   🕐 Slots per day: {len(slots)}")
-        logger.info(f"   ⏰ Total time slots: {total_slots}")
-        logger.info(f"   🏢 Total rooms: {len(all_rooms)}")
-        logger.info(f"   💺 Total room capacity: {total_room_capacity}")
-        logger.info(f"   🎯 TOTAL CAPACITY: {total_capacity} participants")
-        logger.info(f"   👥 Participants to schedule: {len(participants)}")
-        
-        if len(participants) > total_capacity:
-            shortage = len(participants) - total_capacity
-            logger.error(f"❌ CAPACITY EXCEEDED: Need {shortage} more spaces!")
-            self.warnings.append(
-                f"Insufficient capacity: {len(participants)} participants but only {total_capacity} spaces available. "
-                f"Need {shortage} more capacity."
-            )
+        if prepared is None:
             return self._empty_result(len(participants))
+        first_floor_rooms, all_rooms, dates, slots = prepared
+        self.layout = (first_floor_rooms, all_rooms, slots, prioritize_pwd)
         
         # Separate participants by PWD status
         pwd_participants, non_pwd_participants = self._separate_participants(
@@ -276,20 +582,14 @@ class OptimizedScheduler:
         logger.info(f"🏢 1st Floor rooms: {len(first_floor_rooms)}")
         logger.info(f"🏢 All rooms: {len(all_rooms)}")
         
-        # Validate PWD capacity
-        first_floor_capacity = sum(r.get('_capacity', 0) for r in first_floor_rooms) * total_slots
-        if prioritize_pwd and len(pwd_participants) > first_floor_capacity:
-            logger.warning(f"⚠️ PWD participants ({len(pwd_participants)}) exceed 1st floor capacity ({first_floor_capacity})")
-            self.warnings.append(
-                f"PWD participants ({len(pwd_participants)}) exceed 1st floor capacity ({first_floor_capacity}). "
-                f"Some PWD participants will be assigned to upper floors."
-            )
+        if prioritize_pwd:
+            self._check_pwd_capacity(len(pwd_participants), first_floor_rooms)
         
         # ✅ FIXED: Schedule PWD first, then non-PWD (no separate phases)
         pwd_idx = 0
         non_pwd_idx = 0
         
-        if prioritize_pwd and pwd_participants:
+        if prioritize_pwd and len(pwd_participants):
             logger.info("🔄 PHASE 1: Scheduling PWD participants to 1st floor rooms...")
             pwd_idx = self._schedule_group_optimized(
                 pwd_participants, first_floor_rooms, dates, slots
@@ -340,12 +640,246 @@ class OptimizedScheduler:
             "execution_time": exec_time
         }
     
-    def _schedule_group_optimized(self, participants: List[Dict], rooms: List[Dict], 
+    def schedule_stream(
+        self,
+        rooms: List[Dict],
+        pwd_pages: Iterable[List[Dict]],
+        pwd_count: int,
+        other_pages: Iterable[List[Dict]],
+        other_count: int,
+        start_date: str,
+        end_date: str,
+        start_time: str,
+        end_time: str,
+        duration_per_batch: int,
+        exclude_lunch_break: bool = True,
+        lunch_break_start: str = "12:00",
+        lunch_break_end: str = "13:00"
+    ) -> Dict:
+        """
+        Streaming variant of ``schedule``: participants arrive as pages and
+        finished batches go to ``self.sink``, so nothing proportional to the
+        cohort is kept in memory.
+        
+        ``pwd_pages`` is placed on 1st floor rooms first (pass an empty
+        iterable when PWD are not prioritized); ``other_pages`` then fills
+        all rooms. Counts come from the database up front so capacity can be
+        validated before the first page is read.
+        """
+        start_exec = datetime.now()
+        total = pwd_count + other_count
+        logger.info(f"🎯 Starting streaming scheduling for {total} participants")
+        
+        prepared = self._prepare(
+            rooms, total, start_date, end_date, start_time, end_time,
+            duration_per_batch, exclude_lunch_break, lunch_break_start, lunch_break_end
+        )
+        if prepared is None:
+            return self._empty_result(total)
+        first_floor_rooms, all_rooms, dates, slots = prepared
+        
+        pwd_idx = 0
+        if pwd_count:
+            self._check_pwd_capacity(pwd_count, first_floor_rooms)
+            pwd_stream = self._iter_pairs(pwd_pages)
+            pwd_carry: List[Tuple[int, bool]] = []
+            logger.info("🔄 PHASE 1: Streaming PWD participants to 1st floor rooms...")
+            pwd_idx = self._schedule_stream_optimized(pwd_stream, first_floor_rooms, dates, slots, pwd_carry)
+            if pwd_idx < pwd_count:
+                logger.info(f"⚠️ Streaming remaining PWD to all rooms...")
+                pwd_idx += self._schedule_stream_optimized(pwd_stream, all_rooms, dates, slots, pwd_carry)
+            logger.info(f"✅ PWD Phase: {pwd_idx}/{pwd_count} scheduled")
+        
+        logger.info("🔄 PHASE 2: Streaming Non-PWD participants to all rooms...")
+        other_idx = self._schedule_stream_optimized(
+            self._iter_pairs(other_pages), all_rooms, dates, slots
+        )
+        logger.info(f"✅ Non-PWD Phase: {other_idx}/{other_count} scheduled")
+        
+        exec_time = (datetime.now() - start_exec).total_seconds()
+        logger.info(f"✅ STREAMING SCHEDULING COMPLETE: {self.streamed_count}/{total} in {exec_time:.2f}s")
+        
+        return {
+            "batches": [],
+            "scheduled_count": self.streamed_count,
+            "unscheduled_count": total - self.streamed_count,
+            "total_batches": self.batch_no - 1,
+            "pwd_scheduled": pwd_idx,
+            "pwd_unscheduled": pwd_count - pwd_idx,
+            "non_pwd_scheduled": other_idx,
+            "non_pwd_unscheduled": other_count - other_idx,
+            "warnings": self.warnings,
+            "execution_time": exec_time
+        }
+    
+    def room_capacities(self) -> Dict[str, int]:
+        """Seats per room key for the rooms of the last ``schedule`` call"""
+        _, all_rooms, _, _ = self.layout
+        return {f"{r['campus']}|{r['building']}|{r['room']}": r.get('_capacity', 0) for r in all_rooms}
+    
+    def improve(self, budget_ms: int, held_as: Optional[int] = None,
+                accept: Optional[Callable[[List[Dict]], bool]] = None) -> Dict:
+        """
+        Run local search over the greedy batches of the last ``schedule``
+        call, then renumber them in DAY → SLOT → ROOM order.
+        
+        Meant to run outside the booking lock while the greedy batches stay
+        reserved under ``held_as``: the ledger is first refreshed with seats
+        other runs booked since, and ``accept`` gets the improved batches
+        and decides, atomically with booking them, whether they replace the
+        greedy ones. Declined results leave the greedy schedule in place.
+        """
+        first_floor_rooms, all_rooms, slots, prioritize_pwd = self.layout
+        slot_index = {slot['start']: idx for idx, slot in enumerate(slots)}
+        rooms_by_key = {f"{r['campus']}|{r['building']}|{r['room']}": r for r in all_rooms}
+        room_order = {key: idx for idx, key in enumerate(rooms_by_key)}
+        
+        bins = {}
+        for batch in self.batches:
+            key = (
+                batch['batch_date'],
+                slot_index[batch['start_time']],
+                f"{batch['campus']}|{batch['building']}|{batch['room']}"
+            )
+            bins.setdefault(key, []).extend(
+                (a['participant_id'], a['is_pwd']) for a in self.batch_assignments_map[batch['batch_number']]
+            )
+        
+        free = dict(self.room_slot_usage)
+        if held_as is not None and self.occupancy is not None:
+            slot_minutes = [(to_minutes(slot['start']), to_minutes(slot['end'])) for slot in slots]
+            for usage_key, remaining in free.items():
+                day, slot_idx, key = usage_key
+                taken = self.occupancy.booked(key, day, *slot_minutes[slot_idx], exclude=held_as)
+                own = len(bins.get(usage_key, ()))
+                free[usage_key] = max(0, min(remaining, rooms_by_key[key].get('_capacity', 0) - taken - own))
+        
+        logger.info(f"🔧 Local search: {len(self.batches)} batches, budget {budget_ms}ms")
+        optimizer = LocalSearchOptimizer(
+            bins,
+            free,
+            {f"{r['campus']}|{r['building']}|{r['room']}" for r in first_floor_rooms},
+            prioritize_pwd
+        )
+        stats = optimizer.run(budget_ms / 1000)
+        # Bins already merge greedy batches that share a room-slot: report the batches actually built
+        stats["merged_batches"] = stats["before"]["batches"]
+        stats["before"]["batches"] = len(self.batches)
+        logger.info(f"✅ Local search: {stats['before']} → {stats['after']} in {stats['elapsed_ms']}ms")
+        
+        greedy = (self.batches, self.assignments, self.batch_assignments_map, self.batch_no)
+        self.batches = []
+        self.assignments = []
+        self.batch_assignments_map = {}
+        self.batch_no = 1
+        for key in sorted(bins, key=lambda k: (k[0], k[1], room_order[k[2]])):
+            ids, pwd_flags = zip(*bins[key])
+            self._create_batch_fast(list(ids), list(pwd_flags), rooms_by_key[key[2]], slots[key[1]], key[0])
+        
+        stats["accepted"] = accept is None or accept(self.batches)
+        if stats["accepted"]:
+            self.room_slot_usage = free
+        else:
+            logger.warning("⚠️ Local search result no longer fits next to other bookings, keeping the greedy schedule")
+            self.batches, self.assignments, self.batch_assignments_map, self.batch_no = greedy
+        return stats
+    
+    def _prepare(
+        self,
+        rooms: List[Dict],
+        participant_count: int,
+        start_date: str,
+        end_date: str,
+        start_time: str,
+        end_time: str,
+        duration_per_batch: int,
+        exclude_lunch_break: bool,
+        lunch_break_start: str,
+        lunch_break_end: str
+    ) -> Optional[tuple]:
+        """Build rooms, dates, slots and the capacity ledger; None if infeasible"""
+        # Pre-process and cache rooms
+        first_floor_rooms, all_rooms = self._process_rooms(rooms)
+        
+        # ✅ NEW: Initialize room usage tracking
+        dates = self._generate_dates(start_date, end_date)
+        if not dates:
+            logger.error("❌ No valid dates generated")
+            return None
+        
+        slots = self._generate_slots(
+            start_time, end_time, duration_per_batch,
+            exclude_lunch_break, lunch_break_start, lunch_break_end
+        )
+        
+        if not slots:
+            logger.error("❌ No valid time slots generated")
+            return None
+        
+        # ✅ NEW: Initialize room capacity tracking for each slot,
+        # minus seats other schedules already hold in that room-slot
+        slot_minutes = [(to_minutes(slot['start']), to_minutes(slot['end'])) for slot in slots]
+        booked_total = 0
+        for day in dates:
+            day_str = day.strftime("%Y-%m-%d")
+            for slot_idx, (slot_start, slot_end) in enumerate(slot_minutes):
+                for room in all_rooms:
+                    room_key = f"{room['campus']}|{room['building']}|{room['room']}"
+                    usage_key = (day_str, slot_idx, room_key)
+                    capacity = room.get('_capacity', 0)
+                    if self.occupancy is not None:
+                        booked = min(capacity, self.occupancy.booked(room_key, day_str, slot_start, slot_end))
+                        capacity -= booked
+                        booked_total += booked
+                    self.room_slot_usage[usage_key] = capacity
+        
+        # Calculate capacity
+        total_room_capacity = sum(room.get('_capacity', 0) for room in all_rooms)
+        total_slots = len(dates) * len(slots)
+        total_capacity = total_room_capacity * total_slots - booked_total
+        
+        logger.info(f"📊 CAPACITY ANALYSIS:")
+        logger.info(f"   📅 Days: {len(dates)}")
+        logger.info(f"   🕐 Slots per day: {len(slots)}")
+        logger.info(f"   ⏰ Total time slots: {total_slots}")
+        logger.info(f"   🏢 Total rooms: {len(all_rooms)}")
+        logger.info(f"   💺 Total room capacity: {total_room_capacity}")
+        if booked_total:
+            logger.info(f"   🔒 Already booked by other schedules: {booked_total}")
+        logger.info(f"   🎯 TOTAL CAPACITY: {total_capacity} participants")
+        logger.info(f"   👥 Participants to schedule: {participant_count}")
+        
+        if participant_count > total_capacity:
+            shortage = participant_count - total_capacity
+            logger.error(f"❌ CAPACITY EXCEEDED: Need {shortage} more spaces!")
+            self.warnings.append(
+                f"Insufficient capacity: {participant_count} participants but only {total_capacity} spaces available. "
+                f"Need {shortage} more capacity."
+            )
+            return None
+        
+        return first_floor_rooms, all_rooms, dates, slots
+    
+    def _check_pwd_capacity(self, pwd_count: int, first_floor_rooms: List[Dict]):
+        """Warn when PWD participants cannot all fit on the 1st floor"""
+        first_floor_keys = {f"{r['campus']}|{r['building']}|{r['room']}" for r in first_floor_rooms}
+        first_floor_capacity = sum(
+            remaining for (_, _, room_key), remaining in self.room_slot_usage.items()
+            if room_key in first_floor_keys
+        )
+        if pwd_count > first_floor_capacity:
+            logger.warning(f"⚠️ PWD participants ({pwd_count}) exceed 1st floor capacity ({first_floor_capacity})")
+            self.warnings.append(
+                f"PWD participants ({pwd_count}) exceed 1st floor capacity ({first_floor_capacity}). "
+                f"Some PWD participants will be assigned to upper floors."
+            )
+    
+    def _schedule_group_optimized(self, participants: ParticipantArrays, rooms: List[Dict], 
                                   dates: List[date], slots: List[Dict]) -> int:
         """
         ✅ FULLY FIXED: Schedule participants with room tracking to prevent conflicts
         """
-        if not participants or not rooms:
+        if not len(participants) or not rooms:
             return 0
         
         idx = 0
@@ -388,7 +922,8 @@ class OptimizedScheduler:
                     
                     # Create batch
                     self._create_batch_fast(
-                        batch_participants,
+                        batch_participants.ids.tolist(),
+                        batch_participants.pwd.tolist(),
                         room,
                         slot,
                         day_str
@@ -416,7 +951,68 @@ class OptimizedScheduler:
         
         return idx
     
-    def _create_batch_fast(self, people: List[Dict], room: Dict, slot: Dict, day: str):
+    def _schedule_stream_optimized(self, participants: Iterator[Tuple[int, bool]], rooms: List[Dict],
+                                   dates: List[date], slots: List[Dict],
+                                   carry: Optional[List[Tuple[int, bool]]] = None) -> int:
+        """
+        Same DAY → SLOT → ROOM fill as ``_schedule_group_optimized``, but pulls
+        participants lazily from an iterator. Stops as soon as it runs dry;
+        unconsumed participants stay in the iterator for the caller.
+        
+        With ``self.claim`` set, each batch's seats are claimed right before
+        it is built (the ledger may be stale: other runs book while pages are
+        fetched). Participants pulled for seats that turned out to be taken
+        wait in ``carry`` for the next room-slot; pass the same list again to
+        continue the same stream.
+        """
+        if not rooms:
+            return 0
+        if carry is None:
+            carry = []
+        
+        idx = 0
+        for day in dates:
+            day_str = day.strftime("%Y-%m-%d")
+            
+            for slot_idx, slot in enumerate(slots):
+                for room in rooms:
+                    room_key = f"{room['campus']}|{room['building']}|{room['room']}"
+                    usage_key = (day_str, slot_idx, room_key)
+                    
+                    remaining_capacity = self.room_slot_usage.get(usage_key, 0)
+                    if remaining_capacity <= 0:
+                        continue
+                    
+                    if len(carry) < remaining_capacity:
+                        carry.extend(islice(participants, remaining_capacity - len(carry)))
+                    if not carry:
+                        return idx
+                    
+                    size = min(remaining_capacity, len(carry))
+                    if self.claim is not None:
+                        granted = self.claim(room, slot, day_str, size)
+                        if granted < size:
+                            # Another run booked seats here since the ledger was built
+                            self.room_slot_usage[usage_key] = granted
+                            size = granted
+                        if not size:
+                            continue
+                    
+                    ids, pwd_flags = zip(*carry[:size])
+                    del carry[:size]
+                    self._create_batch_fast(list(ids), list(pwd_flags), room, slot, day_str)
+                    self.room_slot_usage[usage_key] -= size
+                    idx += size
+        
+        return idx
+    
+    @staticmethod
+    def _iter_pairs(pages: Iterable[List[Dict]]) -> Iterator[Tuple[int, bool]]:
+        """Flatten row pages into (id, is_pwd) pairs; rows are dropped per page"""
+        for page in pages:
+            yield from ((row["id"], bool(row.get("is_pwd"))) for row in page)
+    
+    def _create_batch_fast(self, ids: List[int], pwd_flags: List[bool], room: Dict, slot: Dict, day: str):
         """Create batch with proper assignments"""
         campus = room.get("campus", "N/A")
         building = room.get("building", "N/A")
@@ -439,20 +1035,18 @@ class OptimizedScheduler:
             "start_time": slot['start'],
             "end_time": slot['end'],
             "time_slot": f"{slot['start']} - {slot['end']}",
-            "participant_count": len(people),
-            "participant_ids": [p["id"] for p in people],
-            "has_pwd": any(p.get("is_pwd", False) for p in people),
+            "participant_count": len(ids),
+            "participant_ids": ids,
+            "has_pwd": any(pwd_flags),
         }
         
-        self.batches.append(batch)
-        
         # ✅ FIXED: Store assignments with batch number for later mapping
         batch_assignments = []
-        for seat_no, participant in enumerate(people, start=1):
+        for seat_no, (participant_id, is_pwd) in enumerate(zip(ids, pwd_flags), start=1):
             assignment = {
-                "participant_id": participant["id"],
+                "participant_id": participant_id,
                 "seat_no": seat_no,
-                "is_pwd": participant.get("is_pwd", False),
+                "is_pwd": is_pwd,
                 "campus": campus,
                 "building": building,
                 "room": room_name,
@@ -463,13 +1057,20 @@ class OptimizedScheduler:
                 "batch_number": self.batch_no  # Store batch number for mapping
             }
             batch_assignments.append(assignment)
-            self.assignments.append(assignment)
         
-        # Store mapping for later
-        self.batch_assignments_map[self.batch_no] = batch_assignments
-        
-        # Track scheduled IDs
-        self.scheduled_ids.update(p["id"] for p in people)
+        if self.sink is not None:
+            # Streaming mode: hand off to the writer instead of keeping it resident
+            self.sink(batch, batch_assignments)
+            self.streamed_count += len(ids)
+        else:
+            self.batches.append(batch)
+            self.assignments.extend(batch_assignments)
+            
+            # Store mapping for later
+            self.batch_assignments_map[self.batch_no] = batch_assignments
+            
+            # Track scheduled IDs
+            self.scheduled_ids.update(ids)
         self.batch_no += 1
     
     def _process_rooms(self, rooms: List[Dict]) -> tuple:
@@ -503,23 +1104,15 @@ class OptimizedScheduler:
         logger.info(f"🏢 Processed {len(all_rooms_processed)} rooms ({len(first_floor)} on 1st floor)")
         return first_floor, all_rooms_processed
     
-    def _separate_participants(self, participants: List[Dict], prioritize: bool) -> tuple:
+    def _separate_participants(self, participants: ParticipantArrays, prioritize: bool) -> tuple:
         """Separate participants by PWD status"""
         if not prioritize:
-            return [], participants
-        
-        pwd = []
-        non_pwd = []
+            return participants[:0], participants
         
-        for p in participants:
-            if p.get("is_pwd", False):
-                pwd.append(p)
-            else:
-                non_pwd.append(p)
-        
-        return pwd, non_pwd
+        return participants[participants.pwd], participants[~participants.pwd]
     
-    def _generate_dates(self, start: str, end: str) -> List[date]:
+    @staticmethod
+    def _generate_dates(start: str, end: str) -> List[date]:
         """Generate date range"""
         try:
             start_dt = datetime.strptime(start, "%Y-%m-%d").date()
@@ -541,7 +1134,8 @@ class OptimizedScheduler:
             logger.error(f"❌ Error generating dates: {e}")
             return []
     
-    def _generate_slots(self, start: str, end: str, duration: int, 
+    @staticmethod
+    def _generate_slots(start: str, end: str, duration: int, 
                         exclude_lunch: bool, lunch_start: str, lunch_end: str) -> List[Dict]:
         """Generate time slots with lunch break handling"""
         try:
@@ -607,10 +1201,882 @@ class OptimizedScheduler:
             "execution_time": 0
         }
 
+# ==================== Streaming Pipeline ====================
+
+def build_summary_row(req: ScheduleRequest, scheduled_count: int, unscheduled_count: int) -> Dict:
+    """schedule_summary row for a request"""
+    return {
+        "event_name": req.event_name,
+        "event_type": req.event_type,
+        "schedule_date": req.schedule_date,
+        "start_time": req.start_time,
+        "end_time": req.end_time,
+        "scheduled_count": scheduled_count,
+        "unscheduled_count": unscheduled_count,
+        "campus_group_id": req.campus_group_id,
+        "participant_group_id": req.participant_group_id
+    }
+
+def delete_schedules(summary_ids: List[int]):
+    """
+    Best-effort removal of schedules and everything written for them,
+    children first. Used to roll back runs that fail after their summary
+    row was created.
+    """
+    if not summary_ids:
+        return
+    for table, column in (
+        ("schedule_assignments", "schedule_summary_id"),
+        ("schedule_batches", "schedule_summary_id"),
+        ("schedule_summary", "id"),
+    ):
+        try:
+            sb.table(table).delete().in_(column, summary_ids).execute()
+        except Exception as e:
+            logger.error(f"❌ Failed to clean up {table} for schedules {summary_ids}: {e}")
+    occupancy_index.discard_summaries(set(summary_ids))
+    for summary_id in summary_ids:
+        snapshot_cache.evict(summary_id)
+    logger.info(f"🧹 Removed schedules {summary_ids}")
+
+def persist_batches(groups: List[Tuple[int, List[Dict], List[Dict]]], batch_size: int = 500,
+                    returned_assignments: Optional[List[Dict]] = None) -> Tuple[List[Dict], int]:
+    """
+    Insert batches of one or more schedules, then their assignments with
+    resolved batch IDs.
+    
+    Args:
+        groups: (schedule_summary_id, batches, assignments) per schedule
+        batch_size: Rows per insert request
+        returned_assignments: Optional list collecting the inserted assignment rows
+    
+    Returns:
+        (inserted batch rows, assignment chunks that failed)
+    """
+    batches_data = []
+    for summary_id, batches, _ in groups:
+        for batch in batches:
+            batch["schedule_summary_id"] = summary_id
+            batches_data.append(batch)
+    
+    # Batch IDs keyed by (summary, batch number): numbers repeat across schedules
+    batch_id_map = {}
+    inserted = []
+    for i in range(0, len(batches_data), batch_size):
+        chunk = batches_data[i:i + batch_size]
+        batches_response = sb.table("schedule_batches").insert(chunk).execute()
+        if not batches_response.data:
+            raise RuntimeError(f"Failed to insert {len(chunk)} batches")
+        inserted.extend(batches_response.data)
+        for batch in batches_response.data:
+            batch_id_map[(batch["schedule_summary_id"], batch["batch_number"])] = batch["id"]
+    
+    assignments_data = []
+    for summary_id, _, assignments in groups:
+        for assignment in assignments:
+            batch_id = batch_id_map.get((summary_id, assignment["batch_number"]))
+            if batch_id:
+                assignment_copy = assignment.copy()
+                assignment_copy["schedule_summary_id"] = summary_id
+                assignment_copy["schedule_batch_id"] = batch_id
+                del assignment_copy["batch_number"]  # Remove temporary field
+                assignments_data.append(assignment_copy)
+    
+    failed_chunks = batch_insert("schedule_assignments", assignments_data, batch_size=batch_size,
+                                 returned=returned_assignments)
+    return inserted, len(failed_chunks)
+
+def _stream_writer(summary_id: int, inbox: queue.Queue, stats: Dict):
+    """
+    Persistence stage: drain (batch, assignments) items from ``inbox`` and
+    write them every STREAM_FLUSH_BATCHES batches. Keeps draining after a
+    failed write so the scheduler never blocks on a full queue.
+    """
+    pending_batches: List[Dict] = []
+    pending_assignments: List[Dict] = []
+    
+    def flush():
+        if not pending_batches:
+            return
+        try:
+            inserted, failed = persist_batches([(summary_id, pending_batches, pending_assignments)])
+            stats["batches"] += len(inserted)
+            stats["failed_chunks"] += failed
+        except Exception as e:
+            logger.error(f"❌ Streaming write failed: {e}")
+            stats["failed_batches"] += len(pending_batches)
+        pending_batches.clear()
+        pending_assignments.clear()
+    
+    while True:
+        item = inbox.get()
+        if item is _STREAM_DONE:
+            break
+        batch, batch_assignments = item
+        pending_batches.append(batch)
+        pending_assignments.extend(batch_assignments)
+        if len(pending_batches) >= STREAM_FLUSH_BATCHES:
+            flush()
+    flush()
+
+def run_streaming_schedule(req: ScheduleRequest) -> ScheduleResponse:
+    """
+    Fetch → schedule → persist with each stage on its own thread, connected
+    by bounded queues. Peak memory depends on the queue depths, not on the
+    number of participants, and wall time approaches the slowest stage.
+    
+    Seats are claimed batch by batch under the booking lock, so other runs
+    are never held up by this run's page fetches or writes. A failed write
+    stops the run and rolls the whole schedule back.
+    """
+    logger.info(f"🌊 Streaming mode (page buffer: {STREAM_PAGE_BUFFER}, batch queue: {STREAM_BATCH_QUEUE})")
+    if req.optimize_budget_ms > 0:
+        logger.warning("⚠️ optimize_budget_ms is ignored in streaming mode: batches are persisted as they are built")
+    
+    rooms = fetch_all_paginated("campuses", "upload_group_id", req.campus_group_id, columns=ROOM_COLUMNS)
+    if not rooms:
+        raise HTTPException(status_code=404, detail="No rooms found for this campus group")
+    
+    # Counts up front so capacity is validated before streaming starts
+    group = ("participants", "upload_group_id", req.participant_group_id)
+    if req.prioritize_pwd:
+        pwd_count = count_rows(*group, query_filter=pwd_only)
+        other_count = count_rows(*group, query_filter=non_pwd_only)
+        pwd_pages = prefetch(
+            iter_paginated(*group, query_filter=pwd_only, columns=PARTICIPANT_COLUMNS), STREAM_PAGE_BUFFER
+        )
+        other_pages = prefetch(
+            iter_paginated(*group, query_filter=non_pwd_only, columns=PARTICIPANT_COLUMNS), STREAM_PAGE_BUFFER
+        )
+    else:
+        pwd_count = 0
+        other_count = count_rows(*group)
+        pwd_pages = iter(())
+        other_pages = prefetch(iter_paginated(*group, columns=PARTICIPANT_COLUMNS), STREAM_PAGE_BUFFER)
+    
+    if pwd_count + other_count == 0:
+        raise HTTPException(status_code=404, detail="No participants found for this participant group")
+    
+    summary_response = sb.table("schedule_summary").insert(build_summary_row(req, 0, 0)).execute()
+    if not summary_response.data:
+        raise HTTPException(status_code=500, detail="Failed to create schedule summary")
+    summary_id = summary_response.data[0]["id"]
+    logger.info(f"✅ Created schedule summary (ID: {summary_id})")
+    
+    inbox: queue.Queue = queue.Queue(maxsize=max(1, STREAM_BATCH_QUEUE))
+    stats = {"batches": 0, "failed_chunks": 0, "failed_batches": 0}
+    writer = threading.Thread(
+        target=_stream_writer, args=(summary_id, inbox, stats),
+        name="schedule-writer", daemon=True
+    )
+    writer.start()
+    profiling.follow(writer)
+    
+    # Each batch's seats are reserved as it is built; the ledger built up
+    # front is only an upper bound, since other runs book in the meantime
+    reservation = occupancy_index.reservation()
+    occupancy_index.bind(reservation, summary_id)
+    
+    def claim(room: Dict, slot: Dict, day: str, seats: int) -> int:
+        key = f"{room['campus']}|{room['building']}|{room['room']}"
+        start, end = to_minutes(slot['start']), to_minutes(slot['end'])
+        with booking_lock:
+            if req.avoid_conflicts:
+                seats = min(seats, room.get('_capacity', 0) - occupancy_index.booked(key, day, start, end))
+            if seats > 0:
+                occupancy_index.add(key, day, start, end, seats, reservation)
+        return max(seats, 0)
+    
+    def sink(batch: Dict, assignments: List[Dict]):
+        if stats["failed_batches"] or stats["failed_chunks"]:
+            raise RuntimeError("Streaming write failed, stopping the run")
+        inbox.put((batch, assignments))
+    
+    try:
+        try:
+            occupancy = load_occupancy(req.start_date, req.end_date) if req.avoid_conflicts else None
+            scheduler = OptimizedScheduler(sink=sink, occupancy=occupancy, claim=claim)
+            result = scheduler.schedule_stream(
+                rooms=rooms,
+                pwd_pages=pwd_pages,
+                pwd_count=pwd_count,
+                other_pages=other_pages,
+                other_count=other_count,
+                start_date=req.start_date,
+                end_date=req.end_date,
+                start_time=req.start_time,
+                end_time=req.end_time,
+                duration_per_batch=req.duration_per_batch,
+                exclude_lunch_break=req.exclude_lunch_break,
+                lunch_break_start=req.lunch_break_start,
+                lunch_break_end=req.lunch_break_end
+            )
+        finally:
+            # Stop fetchers that still hold unconsumed pages, then let the writer finish
+            for pages in (pwd_pages, other_pages):
+                close = getattr(pages, "close", None)
+                if close:
+                    close()
+            inbox.put(_STREAM_DONE)
+            writer.join()
+        if stats["failed_batches"] or stats["failed_chunks"]:
+            raise RuntimeError(
+                f"Streaming persistence failed: {stats['failed_batches']} batches and "
+                f"{stats['failed_chunks']} assignment chunks were not saved"
+            )
+    except Exception:
+        # The writer has stopped, so nothing is written after the rollback
+        logger.error(f"❌ Streaming run failed, removing partial schedule {summary_id}")
+        occupancy_index.release(reservation)
+        delete_schedules([summary_id])
+        raise
+    
+    if result["scheduled_count"] == 0:
+        occupancy_index.release(reservation)
+        delete_schedules([summary_id])
+        logger.error("❌ No participants were scheduled!")
+        raise HTTPException(
+            status_code=400,
+            detail="Scheduling failed: " + "; ".join(result.get("warnings", ["Unknown error"]))
+        )
+    
+    occupancy_index.confirm(reservation, summary_id)
+    sb.table("schedule_summary").update({
+        "scheduled_count": result["scheduled_count"],
+        "unscheduled_count": result["unscheduled_count"]
+    }).eq("id", summary_id).execute()
+    
+    logger.info(f"✅ Streamed {stats['batches']} batches to database")
+    
+    return ScheduleResponse(
+        schedule_summary_id=summary_id,
+        scheduled_count=result["scheduled_count"],
+        unscheduled_count=result["unscheduled_count"],
+        total_batches=result["total_batches"],
+        warnings=result.get("warnings", []),
+        pwd_stats={
+            "pwd_scheduled": result.get("pwd_scheduled", 0),
+            "pwd_unscheduled": result.get("pwd_unscheduled", 0),
+            "non_pwd_scheduled": result.get("non_pwd_scheduled", 0),
+            "non_pwd_unscheduled": result.get("non_pwd_unscheduled", 0)
+        },
+        execution_time=result.get("execution_time", 0)
+    )
+
 # ==================== Endpoints ====================
 
+def validate_batch(req: BatchScheduleRequest):
+    """
+    Reject batches that are too large, or that would seat the same
+    participant group twice at once: the shared ledger only keeps rooms
+    apart, not people.
+    """
+    if not req.events:
+        raise HTTPException(status_code=400, detail="No events to schedule")
+    if len(req.events) > MAX_BATCH_EVENTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_EVENTS} events per batch")
+    
+    for i, first in enumerate(req.events):
+        for second in req.events[i + 1:]:
+            if first.participant_group_id != second.participant_group_id:
+                continue
+            try:
+                same_days = first.start_date <= second.end_date and second.start_date <= first.end_date
+                same_hours = (
+                    to_minutes(first.start_time) < to_minutes(second.end_time)
+                    and to_minutes(second.start_time) < to_minutes(first.end_time)
+                )
+            except ValueError:
+                continue  # Malformed times fail in scheduling with a clearer message
+            if same_days and same_hours:
+                raise HTTPException(
+                    status_code=400,
+                    detail=(
+                        f"Events '{first.event_name}' and '{second.event_name}' use participant group "
+                        f"{first.participant_group_id} on overlapping dates and times"
+                    )
+                )
+
+@router.post("/schedule/batch")
+async def schedule_events_batch(
+    req: BatchScheduleRequest,
+    response: Response,
+    x_request_id: Optional[str] = Header(None)
+):
+    """Admission-controlled entry point for ``run_schedule_batch``"""
+    validate_batch(req)
+    
+    # Events in a batch never stream, so estimate them fully resident
+    events = [event.model_copy(update={"streaming": False}) for event in req.events]
+    try:
+        async with admission.admit(lambda: asyncio.to_thread(estimate_schedule_mb, events), x_request_id) as ticket:
+            response.headers["X-Queue-Position"] = str(ticket.position)
+            response.headers["X-Ticket-Id"] = ticket.id
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, run_schedule_batch, req)
+    except AdmissionRejected as e:
+        raise rejected(e)
+
+def run_schedule_batch(req: BatchScheduleRequest) -> BatchScheduleResponse:
+    """
+    Schedule several events in one call. Rooms and participants are fetched
+    once per group, events are scheduled in order against one shared
+    occupancy ledger (so they cannot collide with each other), and every
+    summary, batch and assignment is written in a single bulk phase that
+    is rolled back as a whole if it fails.
+    Per-event ``streaming`` and ``avoid_conflicts`` flags are ignored.
+    """
+    start_exec = datetime.now()
+    validate_batch(req)
+    
+    logger.info("="*60)
+    logger.info(f"🚀 STARTING BATCH SCHEDULE GENERATION ({len(req.events)} events)")
+    logger.info("="*60)
+    
+    scheduled = []  # (event index, scheduler, result, reservation)
+    summary_ids: List[int] = []
+    try:
+        rooms_by_group: Dict[int, List[Dict]] = {}
+        participants_by_group: Dict[int, ParticipantArrays] = {}
+        for event in req.events:
+            if event.campus_group_id not in rooms_by_group:
+                rooms_by_group[event.campus_group_id] = fetch_all_paginated(
+                    "campuses", "upload_group_id", event.campus_group_id, columns=ROOM_COLUMNS
+                )
+            if event.participant_group_id not in participants_by_group:
+                participants_by_group[event.participant_group_id] = fetch_participants(event.participant_group_id)
+        
+        if req.avoid_conflicts:
+            first_day = min(event.start_date for event in req.events)
+            last_day = max(event.end_date for event in req.events)
+            ledger = load_occupancy(first_day, last_day)
+        else:
+            # Events of this batch still must not collide with each other
+            ledger = RoomOccupancyIndex()
+        
+        results: List[Optional[Dict]] = []
+        with booking_lock:
+            for idx, event in enumerate(req.events):
+                logger.info(f"📋 Event {idx + 1}/{len(req.events)}: {event.event_name}")
+                rooms = rooms_by_group[event.campus_group_id]
+                participants = participants_by_group[event.participant_group_id]
+                
+                if not rooms or not len(participants):
+                    missing = "rooms" if not rooms else "participants"
+                    results.append({"event_name": event.event_name, "error": f"No {missing} found"})
+                    continue
+                
+                scheduler = OptimizedScheduler(occupancy=ledger)
+                result = scheduler.schedule(
+                    rooms=rooms,
+                    participants=participants,
+                    start_date=event.start_date,
+                    end_date=event.end_date,
+                    start_time=event.start_time,
+                    end_time=event.end_time,
+                    duration_per_batch=event.duration_per_batch,
+                    prioritize_pwd=event.prioritize_pwd,
+                    exclude_lunch_break=event.exclude_lunch_break,
+                    lunch_break_start=event.lunch_break_start,
+                    lunch_break_end=event.lunch_break_end
+                )
+                if result["scheduled_count"] == 0:
+                    results.append({
+                        "event_name": event.event_name,
+                        "error": "Scheduling failed: " + "; ".join(result.get("warnings", ["Unknown error"]))
+                    })
+                    continue
+                
+                # Later events in this batch, and concurrent runs, see these seats as taken
+                reservation = occupancy_index.reserve(result["batches"])
+                if ledger is not occupancy_index:
+                    for batch in result["batches"]:
+                        ledger.add_batch(batch, reservation)
+                results.append(None)
+                scheduled.append((idx, scheduler, result, reservation))
+        
+        # Local search runs after the lock is released, on seats already reserved
+        for idx, scheduler, result, reservation in scheduled:
+            if req.events[idx].optimize_budget_ms > 0:
+                improve_reserved(scheduler, result, req.events[idx].optimize_budget_ms, reservation, ledger)
+        
+        warnings = []
+        if scheduled:
+            logger.info("\n💾 Saving all events to database...")
+            summaries_response = sb.table("schedule_summary").insert([
+                build_summary_row(req.events[idx], result["scheduled_count"], result["unscheduled_count"])
+                for idx, _, result, _ in scheduled
+            ]).execute()
+            summary_ids = [row["id"] for row in summaries_response.data or []]
+            if len(summary_ids) != len(scheduled):
+                raise HTTPException(status_code=500, detail="Failed to create schedule summaries")
+            for summary_id, (*_, reservation) in zip(summary_ids, scheduled):
+                occupancy_index.bind(reservation, summary_id)
+            
+            inserted_assignments: List[Dict] = []
+            inserted, failed_chunks = persist_batches([
+                (summary_id, result["batches"], scheduler.assignments)
+                for summary_id, (_, scheduler, result, _) in zip(summary_ids, scheduled)
+            ], returned_assignments=inserted_assignments)
+            for summary_id, (*_, reservation) in zip(summary_ids, scheduled):
+                occupancy_index.confirm(reservation, summary_id)
+            logger.info(f"✅ Created {len(summary_ids)} summaries and {len(inserted)} batches")
+            if failed_chunks:
+                logger.error(f"❌ Failed to insert {failed_chunks} assignment chunks")
+                warnings.append(f"{failed_chunks} assignment chunks failed to save")
+            else:
+                rows_by_summary = {
+                    summary_id: {table: [] for table in snapshot_cache.TABLES} for summary_id in summary_ids
+                }
+                for table, rows in (("schedule_batches", inserted), ("schedule_assignments", inserted_assignments)):
+                    for row in rows:
+                        rows_by_summary[row["schedule_summary_id"]][table].append(row)
+                for summary_id, tables in rows_by_summary.items():
+                    snapshot_cache.write(summary_id, tables)
+            
+            for summary_id, (idx, _, result, _) in zip(summary_ids, scheduled):
+                results[idx] = ScheduleResponse(
+                    schedule_summary_id=summary_id,
+                    scheduled_count=result["scheduled_count"],
+                    unscheduled_count=result["unscheduled_count"],
+                    total_batches=len(result["batches"]),
+                    warnings=result.get("warnings", []),
+                    pwd_stats={
+                        "pwd_scheduled": result.get("pwd_scheduled", 0),
+                        "pwd_unscheduled": result.get("pwd_unscheduled", 0),
+                        "non_pwd_scheduled": result.get("non_pwd_scheduled", 0),
+                        "non_pwd_unscheduled": result.get("non_pwd_unscheduled", 0)
+                    },
+                    execution_time=result.get("execution_time", 0),
+                    optimization=result.get("optimization", {})
+                ).model_dump()
+        
+        logger.info(f"✅ BATCH SCHEDULE GENERATION COMPLETE: {len(scheduled)}/{len(req.events)} events")
+        return BatchScheduleResponse(
+            results=results,
+            scheduled_events=len(scheduled),
+            failed_events=len(req.events) - len(scheduled),
+            warnings=warnings,
+            execution_time=(datetime.now() - start_exec).total_seconds()
+        )
+    
+    except Exception as e:
+        # All or nothing: drop whatever was written, and give back the reserved seats
+        delete_schedules(summary_ids)
+        for *_, reservation in scheduled:
+            occupancy_index.release(reservation)
+        if isinstance(e, HTTPException):
+            raise
+        logger.exception("❌ Batch schedule generation failed")
+        raise HTTPException(status_code=500, detail=f"Batch scheduling failed: {str(e)}")
+
+def end_date_after(start_date: str, days: Optional[int]) -> Optional[str]:
+    """Last date of a ``days``-day range starting at ``start_date``"""
+    if days is None:
+        return None
+    start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
+    return (start_dt + timedelta(days=max(days, 1) - 1)).strftime("%Y-%m-%d")
+
+@router.post("/schedule/precheck")
+def precheck_schedule(req: PrecheckRequest):
+    """
+    Feasibility of a schedule configuration from aggregates only: exact
+    row counts from the database, summed room capacity and the same slot
+    generation the scheduler uses. No participant rows are downloaded.
+    With ``avoid_conflicts`` (the default, as for /schedule) seats already
+    booked by other schedules are subtracted.
+    """
+    start_exec = datetime.now()
+    
+    group = ("participants", "upload_group_id", req.participant_group_id)
+    participant_count = count_rows(*group)
+    pwd_count = count_rows(*group, query_filter=pwd_only)
+    
+    rooms = fetch_all_paginated("campuses", "upload_group_id", req.campus_group_id, columns=ROOM_COLUMNS)
+    if not rooms:
+        raise HTTPException(status_code=404, detail="No rooms found for this campus group")
+    if not participant_count:
+        raise HTTPException(status_code=404, detail="No participants found for this participant group")
+    
+    first_floor_rooms, all_rooms = OptimizedScheduler()._process_rooms(rooms)
+    room_capacity = sum(r['_capacity'] for r in all_rooms)
+    first_floor_room_capacity = sum(r['_capacity'] for r in first_floor_rooms)
+    
+    dates = OptimizedScheduler._generate_dates(req.start_date, req.end_date)
+    slots = OptimizedScheduler._generate_slots(
+        req.start_time, req.end_time, req.duration_per_batch,
+        req.exclude_lunch_break, req.lunch_break_start, req.lunch_break_end
+    )
+    
+    warnings = []
+    if not dates:
+        warnings.append(f"Invalid date range: {req.start_date} to {req.end_date}")
+    if not slots:
+        warnings.append("No valid time slots for this time range and duration")
+    
+    total_slots = len(dates) * len(slots)
+    occupancy = load_occupancy(req.start_date, req.end_date) if req.avoid_conflicts and dates else None
+    calendar = CapacityCalendar(first_floor_rooms, all_rooms, slots, occupancy)
+    total_capacity, first_floor_capacity = calendar.capacity(
+        [d.strftime("%Y-%m-%d") for d in dates], len(slots)
+    )
+    already_booked = room_capacity * total_slots - total_capacity
+    shortage = max(0, participant_count - total_capacity)
+    pwd_shortage = max(0, pwd_count - first_floor_capacity) if req.prioritize_pwd else 0
+    
+    if shortage:
+        warnings.append(
+            f"Insufficient capacity: {participant_count} participants but only {total_capacity} spaces available. "
+            f"Need {shortage} more capacity."
+        )
+    if pwd_shortage:
+        warnings.append(
+            f"PWD participants ({pwd_count}) exceed 1st floor capacity ({first_floor_capacity}). "
+            f"Some PWD participants will be assigned to upper floors."
+        )
+    
+    # Shortest range from start_date that seats everyone (and, if prioritized, every PWD on the 1st floor),
+    # whatever end_date was given: an end date before start_date is when this is most useful
+    min_end_date = None
+    min_end_date_pwd = None
+    try:
+        start_dt = datetime.strptime(req.start_date, "%Y-%m-%d").date()
+    except ValueError:
+        start_dt = None
+    if start_dt and slots:
+        pwd_needed = pwd_count if req.prioritize_pwd else 0
+        fits_all = lambda free: free[0] >= participant_count
+        fits_pwd = lambda free: fits_all(free) and free[1] >= pwd_needed
+        prefix, horizon = free_seat_prefix(
+            first_floor_rooms, all_rooms, slots, start_dt, fits_all, PRECHECK_MAX_DAYS, req.avoid_conflicts
+        )
+        if fits_all(prefix[horizon]):
+            min_end_date = end_date_after(req.start_date, smallest_fitting(1, horizon, lambda d: fits_all(prefix[d])))
+            # The PWD search goes on from the days already read
+            prefix, horizon = free_seat_prefix(
+                first_floor_rooms, all_rooms, slots, start_dt, fits_pwd, PRECHECK_MAX_DAYS, req.avoid_conflicts,
+                prefix=prefix
+            )
+            if fits_pwd(prefix[horizon]):
+                min_end_date_pwd = end_date_after(
+                    req.start_date, smallest_fitting(1, horizon, lambda d: fits_pwd(prefix[d]))
+                )
+    
+    return {
+        "feasible": bool(dates and slots) and shortage == 0,
+        "pwd_first_floor_feasible": bool(dates and slots) and pwd_shortage == 0,
+        "participants": participant_count,
+        "pwd_participants": pwd_count,
+        "rooms": len(all_rooms),
+        "first_floor_rooms": len(first_floor_rooms),
+        "capacity_per_slot": {
+            "total": room_capacity,
+            "first_floor": first_floor_room_capacity,
+            "upper_floors": room_capacity - first_floor_room_capacity
+        },
+        "days": len(dates),
+        "slots_per_day": len(slots),
+        "total_capacity": total_capacity,
+        "first_floor_capacity": first_floor_capacity,
+        "already_booked": already_booked,
+        "shortage": shortage,
+        "pwd_shortage": pwd_shortage,
+        "min_end_date": min_end_date,
+        "min_end_date_pwd_first_floor": min_end_date_pwd,
+        "warnings": warnings,
+        "execution_time": (datetime.now() - start_exec).total_seconds()
+    }
+
+class CapacityCalendar:
+    """
+    Free seats per day and slot for a room set, net of seats other
+    schedules hold when an occupancy index is given. Days are computed
+    lazily and cached; without an index every day is the same.
+    """
+    
+    __slots__ = ('rooms', 'slot_minutes', 'occupancy', '_days')
+    
+    def __init__(self, first_floor_rooms: List[Dict], all_rooms: List[Dict], slots: List[Dict],
+                 occupancy: Optional[RoomOccupancyIndex] = None):
+        first_floor_keys = {f"{r['campus']}|{r['building']}|{r['room']}" for r in first_floor_rooms}
+        self.rooms = []
+        for room in all_rooms:
+            room_key = f"{room['campus']}|{room['building']}|{room['room']}"
+            self.rooms.append((room_key, room['_capacity'], room_key in first_floor_keys))
+        self.slot_minutes = [(to_minutes(slot['start']), to_minutes(slot['end'])) for slot in slots]
+        self.occupancy = occupancy
+        self._days: Dict[str, Tuple[List[int], List[int]]] = {}
+    
+    def day(self, day_str: str) -> Tuple[List[int], List[int]]:
+        """(free seats per slot, free 1st floor seats per slot) on one day"""
+        cache_key = day_str if self.occupancy is not None else None
+        cached = self._days.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        totals, first_floor = [], []
+        for slot_start, slot_end in self.slot_minutes:
+            total = ff = 0
+            for key, capacity, on_first_floor in self.rooms:
+                if self.occupancy is not None:
+                    capacity -= min(capacity, self.occupancy.booked(key, day_str, slot_start, slot_end))
+                total += capacity
+                if on_first_floor:
+                    ff += capacity
+            totals.append(total)
+            first_floor.append(ff)
+        self._days[cache_key] = (totals, first_floor)
+        return totals, first_floor
+    
+    def capacity(self, days: List[str], slot_count: int) -> Tuple[int, int]:
+        """(total, 1st floor) free seats over ``days`` using the first ``slot_count`` slots"""
+        total = ff = 0
+        for day_str in days:
+            totals, first_floor = self.day(day_str)
+            total += sum(totals[:slot_count])
+            ff += sum(first_floor[:slot_count])
+        return total, ff
+
+def smallest_fitting(lo: int, hi: int, fits: Callable[[int], bool]) -> int:
+    """Smallest n in [lo, hi] with fits(n), assuming fits is monotone and fits(hi)"""
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if fits(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+def free_seat_prefix(
+    first_floor_rooms: List[Dict],
+    all_rooms: List[Dict],
+    slots: List[Dict],
+    start_dt: date,
+    fits: Callable[[Tuple[int, int]], bool],
+    max_days: int,
+    avoid_conflicts: bool,
+    prefix: Optional[List[Tuple[int, int]]] = None
+) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    Running (total, 1st floor) free seats per day from ``start_dt``, with
+    the horizon doubled until ``fits`` holds or ``max_days`` is reached.
+    The search stops after the first day if ``fits`` could not hold within
+    ``max_days`` even with nothing booked (e.g. PWD but no 1st floor seats).
+    
+    Args:
+        prefix: Sums from an earlier call with the same rooms and slots, to extend
+    
+    Returns:
+        (prefix sums, where prefix[d] covers the first d days; horizon reached)
+    """
+    if prefix is None:
+        prefix = [(0, 0)]
+    start_date = start_dt.strftime("%Y-%m-%d")
+    
+    def extend_to(days: int):
+        if days < len(prefix):
+            return
+        occupancy = load_occupancy(start_date, end_date_after(start_date, days)) if avoid_conflicts else None
+        calendar = CapacityCalendar(first_floor_rooms, all_rooms, slots, occupancy)
+        for offset in range(len(prefix) - 1, days):
+            day_str = (start_dt + timedelta(days=offset)).strftime("%Y-%m-%d")
+            total, ff = calendar.capacity([day_str], len(slots))
+            prefix.append((prefix[-1][0] + total, prefix[-1][1] + ff))
+    
+    per_day_total = sum(r['_capacity'] for r in all_rooms) * len(slots)
+    per_day_first_floor = sum(r['_capacity'] for r in first_floor_rooms) * len(slots)
+    reachable = fits((per_day_total * max_days, per_day_first_floor * max_days))
+    
+    horizon = 1
+    extend_to(horizon)
+    while reachable and not fits(prefix[horizon]) and horizon < max_days:
+        horizon = min(horizon * 2, max_days)
+        extend_to(horizon)
+    return prefix, horizon
+
+@router.post("/schedule/min-horizon")
+def min_horizon(req: HorizonRequest):
+    """
+    Shortest configuration that seats every participant (and every PWD on
+    the 1st floor when ``prioritize_pwd`` is set), from capacity arithmetic
+    instead of trial scheduling runs.
+    
+    Without ``end_date``: the earliest end date, found by doubling the
+    horizon until it fits and then binary searching the day count.
+    With ``end_date``: the fewest slots per day (earliest ``end_time``)
+    that fits in the given date range, binary searched over slot count.
+    """
+    start_exec = datetime.now()
+    
+    group = ("participants", "upload_group_id", req.participant_group_id)
+    participant_count = count_rows(*group)
+    pwd_needed = count_rows(*group, query_filter=pwd_only) if req.prioritize_pwd else 0
+    
+    rooms = fetch_all_paginated("campuses", "upload_group_id", req.campus_group_id, columns=ROOM_COLUMNS)
+    if not rooms:
+        raise HTTPException(status_code=404, detail="No rooms found for this campus group")
+    if not participant_count:
+        raise HTTPException(status_code=404, detail="No participants found for this participant group")
+    
+    slots = OptimizedScheduler._generate_slots(
+        req.start_time, req.end_time, req.duration_per_batch,
+        req.exclude_lunch_break, req.lunch_break_start, req.lunch_break_end
+    )
+    if not slots:
+        raise HTTPException(status_code=400, detail="No valid time slots for this time range and duration")
+    try:
+        start_dt = datetime.strptime(req.start_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid start_date: {req.start_date}")
+    
+    first_floor_rooms, all_rooms = OptimizedScheduler()._process_rooms(rooms)
+    
+    def occupancy_for(days: int) -> Optional[RoomOccupancyIndex]:
+        if not req.avoid_conflicts:
+            return None
+        return load_occupancy(req.start_date, end_date_after(req.start_date, days))
+    
+    def fits(free: Tuple[int, int]) -> bool:
+        total, ff = free
+        return total >= participant_count and ff >= pwd_needed
+    
+    result = {
+        "participants": participant_count,
+        "pwd_participants_first_floor": pwd_needed,
+        "rooms": len(all_rooms),
+        "first_floor_rooms": len(first_floor_rooms),
+    }
+    
+    if req.end_date is None:
+        prefix, horizon = free_seat_prefix(
+            first_floor_rooms, all_rooms, slots, start_dt, fits, req.max_days, req.avoid_conflicts
+        )
+        feasible = fits(prefix[horizon])
+        days = smallest_fitting(1, horizon, lambda d: fits(prefix[d])) if feasible else None
+        result.update({
+            "mode": "end_date",
+            "feasible": feasible,
+            "min_end_date": end_date_after(req.start_date, days) if feasible else None,
+            "days": days,
+            "slots_per_day": len(slots),
+            "capacity": prefix[days][0] if feasible else prefix[horizon][0],
+            "first_floor_capacity": prefix[days][1] if feasible else prefix[horizon][1],
+        })
+        if not feasible:
+            result["warnings"] = [f"Does not fit within max_days ({req.max_days})"]
+    else:
+        dates = OptimizedScheduler._generate_dates(req.start_date, req.end_date)
+        if not dates:
+            raise HTTPException(status_code=400, detail=f"Invalid date range: {req.start_date} to {req.end_date}")
+        calendar = CapacityCalendar(first_floor_rooms, all_rooms, slots, occupancy_for(len(dates)))
+        day_strs = [d.strftime("%Y-%m-%d") for d in dates]
+        
+        feasible = fits(calendar.capacity(day_strs, len(slots)))
+        slot_count = (
+            smallest_fitting(1, len(slots), lambda k: fits(calendar.capacity(day_strs, k)))
+            if feasible else None
+        )
+        free = calendar.capacity(day_strs, slot_count or len(slots))
+        result.update({
+            "mode": "slots",
+            "feasible": feasible,
+            "days": len(dates),
+            "min_slots_per_day": slot_count,
+            "end_time": slots[slot_count - 1]['end'] if feasible else None,
+            "capacity": free[0],
+            "first_floor_capacity": free[1],
+        })
+        if not feasible:
+            result["warnings"] = ["Does not fit in this date range even with every slot used"]
+    
+    result["execution_time"] = (datetime.now() - start_exec).total_seconds()
+    return result
+
+def is_admin(token: Optional[str]) -> bool:
+    """True when ADMIN_TOKEN is configured and ``token`` matches it"""
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+def require_admin(token: Optional[str]):
+    """Reject admin calls unless ADMIN_TOKEN is configured and matches"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: ADMIN_TOKEN is not configured")
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+def estimate_schedule_mb(events: List[ScheduleRequest]) -> float:
+    """
+    Estimated peak memory of scheduling ``events`` in one run, from
+    participant × room counts. Streaming runs only hold a bounded window
+    of participants. Falls back to the whole budget if counting fails.
+    """
+    try:
+        total_bytes = 0
+        for event in events:
+            participants = count_rows("participants", "upload_group_id", event.participant_group_id)
+            rooms = count_rows("campuses", "upload_group_id", event.campus_group_id)
+            start_dt = datetime.strptime(event.start_date, "%Y-%m-%d").date()
+            end_dt = datetime.strptime(event.end_date, "%Y-%m-%d").date()
+            days = max(0, (end_dt - start_dt).days + 1)
+            slots = len(OptimizedScheduler._generate_slots(
+                event.start_time, event.end_time, event.duration_per_batch,
+                event.exclude_lunch_break, event.lunch_break_start, event.lunch_break_end
+            ))
+            if event.streaming:
+                participants = min(participants, STREAM_PAGE_BUFFER * 2000 + STREAM_BATCH_QUEUE * 100)
+            total_bytes += participants * MEMORY_PER_PARTICIPANT + days * slots * rooms * MEMORY_PER_LEDGER_ENTRY
+        return MEMORY_BASE_MB + total_bytes / (1024 * 1024)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not estimate schedule memory, assuming full budget: {e}")
+        return admission.memory_budget_mb
+
+def rejected(e: AdmissionRejected) -> HTTPException:
+    headers = {"Retry-After": str(e.retry_after), "X-Queue-Position": str(e.position)}
+    if e.ticket_id:
+        headers["X-Ticket-Id"] = e.ticket_id
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+
+@router.get("/schedule/queue/{ticket_id}")
+async def queue_status(ticket_id: str):
+    """
+    Live place in line of a schedule request, looked up by the
+    ``X-Request-Id`` it was sent with (also returned as ``X-Ticket-Id``)
+    """
+    status = admission.status(ticket_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="No waiting or running request with this ticket")
+    return status
+
 @router.post("/schedule")
-async def schedule_event(req: ScheduleRequest):
+async def schedule_event(
+    req: ScheduleRequest,
+    response: Response,
+    x_profile: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None),
+    x_request_id: Optional[str] = Header(None)
+):
+    if x_profile:
+        # Forcing a profile is an admin action, like the global toggle
+        require_admin(x_admin_token)
+    mode = profiling.requested_mode(x_profile, authorized=is_admin(x_admin_token))
+    try:
+        async with admission.admit(lambda: asyncio.to_thread(estimate_schedule_mb, [req]), x_request_id) as ticket:
+            response.headers["X-Queue-Position"] = str(ticket.position)
+            response.headers["X-Ticket-Id"] = ticket.id
+            loop = asyncio.get_running_loop()
+            result, profile_id = await loop.run_in_executor(
+                executor, profiling.call, f"schedule {req.event_name}", mode, run_schedule, req
+            )
+    except AdmissionRejected as e:
+        raise rejected(e)
+    
+    if profile_id:
+        response.headers["X-Profile-Id"] = profile_id
+    return result
+
+def run_schedule(req: ScheduleRequest) -> ScheduleResponse:
+    reservation = None
     try:
         logger.info("="*60)
         logger.info("🚀 STARTING SCHEDULE GENERATION")
@@ -625,34 +2091,42 @@ async def schedule_event(req: ScheduleRequest):
             logger.info(f"Lunch break: {req.lunch_break_start} - {req.lunch_break_end}")
         logger.info(f"Prioritize PWD: {req.prioritize_pwd}")
         
+        if req.streaming:
+            return run_streaming_schedule(req)
+        
         # Fetch ALL data
         logger.info(f"\n📥 Fetching data from database...")
-        rooms = fetch_all_paginated("campuses", "upload_group_id", req.campus_group_id)
-        participants = fetch_all_paginated("participants", "upload_group_id", req.participant_group_id)
+        rooms = fetch_all_paginated("campuses", "upload_group_id", req.campus_group_id, columns=ROOM_COLUMNS)
+        participants = fetch_participants(req.participant_group_id)
 
         if not rooms:
             raise HTTPException(status_code=404, detail="No rooms found for this campus group")
-        if not participants:
+        if not len(participants):
             raise HTTPException(status_code=404, detail="No participants found for this participant group")
 
         logger.info(f"✅ Fetched {len(rooms)} rooms")
         logger.info(f"✅ Fetched {len(participants)} participants")
 
-        # Initialize scheduler and run
-        scheduler = OptimizedScheduler()
-        result = scheduler.schedule(
-            rooms=rooms,
-            participants=participants,
-            start_date=req.start_date,
-            end_date=req.end_date,
-            start_time=req.start_time,
-            end_time=req.end_time,
-            duration_per_batch=req.duration_per_batch,
-            prioritize_pwd=req.prioritize_pwd,
-            exclude_lunch_break=req.exclude_lunch_break,
-            lunch_break_start=req.lunch_break_start,
-            lunch_break_end=req.lunch_break_end
-        )
+        # Initialize scheduler and run; seats stay reserved until persisted
+        occupancy = load_occupancy(req.start_date, req.end_date) if req.avoid_conflicts else None
+        with booking_lock:
+            scheduler = OptimizedScheduler(occupancy=occupancy)
+            result = scheduler.schedule(
+                rooms=rooms,
+                participants=participants,
+                start_date=req.start_date,
+                end_date=req.end_date,
+                start_time=req.start_time,
+                end_time=req.end_time,
+                duration_per_batch=req.duration_per_batch,
+                prioritize_pwd=req.prioritize_pwd,
+                exclude_lunch_break=req.exclude_lunch_break,
+                lunch_break_start=req.lunch_break_start,
+                lunch_break_end=req.lunch_break_end
+            )
+            reservation = occupancy_index.reserve(result["batches"])
+        if req.optimize_budget_ms > 0 and result["batches"]:
+            improve_reserved(scheduler, result, req.optimize_budget_ms, reservation, occupancy)
 
         # ✅ FIXED: Check if scheduling was successful
         if result["scheduled_count"] == 0:
@@ -664,23 +2138,14 @@ async def schedule_event(req: ScheduleRequest):
 
         # Create schedule summary
         logger.info("\n💾 Saving to database...")
-        summary_data = {
-            "event_name": req.event_name,
-            "event_type": req.event_type,
-            "schedule_date": req.schedule_date,
-            "start_time": req.start_time,
-            "end_time": req.end_time,
-            "scheduled_count": result["scheduled_count"],
-            "unscheduled_count": result["unscheduled_count"],
-            "campus_group_id": req.campus_group_id,
-            "participant_group_id": req.participant_group_id
-        }
+        summary_data = build_summary_row(req, result["scheduled_count"], result["unscheduled_count"])
 
         summary_response = sb.table("schedule_summary").insert(summary_data).execute()
         if not summary_response.data:
             raise HTTPException(status_code=500, detail="Failed to create schedule summary")
         
         summary_id = summary_response.data[0]["id"]
+        occupancy_index.bind(reservation, summary_id)
         logger.info(f"✅ Created schedule summary (ID: {summary_id})")
 
         # Insert batches
@@ -695,6 +2160,7 @@ async def schedule_event(req: ScheduleRequest):
                 raise HTTPException(status_code=500, detail="Failed to create batches")
 
             logger.info(f"✅ Created {len(batches_response.data)} batches")
+            occupancy_index.confirm(reservation, summary_id)
 
             # ✅ FIXED: Create batch ID mapping using batch_number
             batch_id_map = {
@@ -718,12 +2184,18 @@ async def schedule_event(req: ScheduleRequest):
             # Insert assignments
             if assignments_data:
                 logger.info(f"💾 Inserting {len(assignments_data)} assignments...")
-                failed_chunks = batch_insert("schedule_assignments", assignments_data, batch_size=500)
+                inserted_assignments: List[Dict] = []
+                failed_chunks = batch_insert("schedule_assignments", assignments_data, batch_size=500,
+                                             returned=inserted_assignments)
                 
                 if failed_chunks:
                     logger.error(f"❌ Failed to insert {len(failed_chunks)} assignment chunks")
                 else:
                     logger.info(f"✅ All assignments inserted successfully")
+                    snapshot_cache.write(summary_id, {
+                        "schedule_batches": batches_response.data,
+                        "schedule_assignments": inserted_assignments,
+                    })
 
         logger.info("\n" + "="*60)
         logger.info("✅ SCHEDULE GENERATION COMPLETE")
@@ -741,11 +2213,140 @@ async def schedule_event(req: ScheduleRequest):
                 "non_pwd_scheduled": result.get("non_pwd_scheduled", 0),
                 "non_pwd_unscheduled": result.get("non_pwd_unscheduled", 0)
             },
-            execution_time=result.get("execution_time", 0)
+            execution_time=result.get("execution_time", 0),
+            optimization=result.get("optimization", {})
         )
 
-    except HTTPException:
-        raise
     except Exception as e:
+        # Seats of a run that was not persisted go back (no-op once confirmed)
+        if reservation is not None:
+            occupancy_index.release(reservation)
+        if isinstance(e, HTTPException):
+            raise
         logger.exception("❌ Schedule generation failed")
-        raise HTTPException(status_code=500, detail=f"Scheduling failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Scheduling failed: {str(e)}")
+
+@router.get("/profiling")
+async def get_profiling(x_admin_token: Optional[str] = Header(None)):
+    """Current admin profiling toggle"""
+    require_admin(x_admin_token)
+    return {**profiling.state, "retention": profiling.PROFILE_RETENTION}
+
+@router.post("/profiling")
+async def set_profiling(toggle: ProfilingToggle, x_admin_token: Optional[str] = Header(None)):
+    """Profile every schedule run while enabled"""
+    require_admin(x_admin_token)
+    try:
+        return profiling.set_enabled(toggle.enabled, toggle.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Stored profiles, newest first"""
+    require_admin(x_admin_token)
+    return {"profiles": profiling.list_profiles()}
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Download a profile: speedscope JSON for sampled runs, pstats for cProfile runs"""
+    require_admin(x_admin_token)
+    found = profiling.profile_path(profile_id)
+    if not found:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    path, meta = found
+    media_type = "application/json" if meta["mode"] == "sample" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+def schedule_table_version(table: str, summary_id: int) -> Tuple[int, Optional[int]]:
+    """(row count, highest id) of a schedule's rows, comparable with snapshot_cache versions"""
+    response = sb.table(table)\
+        .select("id", count="exact")\
+        .eq("schedule_summary_id", summary_id)\
+        .order("id", desc=True)\
+        .limit(1)\
+        .execute()
+    return response.count or 0, response.data[0]["id"] if response.data else None
+
+def read_schedule(summary_id: int, tables: Tuple[str, ...] = snapshot_cache.TABLES) -> Tuple[Dict[str, List[Dict]], str]:
+    """
+    Rows of ``tables`` for a generated schedule, ordered by id, from the
+    local snapshot cache when it is current and from the database
+    otherwise; a full read (both tables) then warms the cache.
+    
+    Schedule rows are only ever inserted or deleted, so a snapshot is
+    current while each table's row count and highest id still match the
+    database; a snapshot that no longer matches (e.g. participants were
+    removed from the schedule) is dropped. Snapshots always hold batches
+    and schedules are deleted children first, so a deleted schedule never
+    matches: a cache hit costs only the version queries, run side by side.
+    
+    Returns:
+        ({table: rows}, "cache" or "database")
+    """
+    versions = dict(zip(tables, version_pool.map(lambda table: schedule_table_version(table, summary_id), tables)))
+    snapshot = snapshot_cache.load(summary_id)
+    if snapshot is not None and any(snapshot.version(table) != versions[table] for table in tables):
+        logger.info(f"🗄️ Schedule {summary_id} changed since its snapshot, reading database")
+        snapshot_cache.evict(summary_id)
+        snapshot = None
+    if snapshot is not None:
+        return {table: snapshot.rows(table) for table in tables}, "cache"
+    
+    summary_response = sb.table("schedule_summary").select("id").eq("id", summary_id).execute()
+    if not summary_response.data:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    try:
+        rows = {
+            table: [
+                row
+                for page in iter_paginated(
+                    table, "schedule_summary_id", summary_id,
+                    query_filter=lambda q: q.order("id"), strict=True
+                )
+                for row in page
+            ]
+            for table in tables
+        }
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Failed to read schedule {summary_id}: {e}")
+    # Only a full read that matches the counted rows may warm the cache
+    if set(tables) == set(snapshot_cache.TABLES) and rows["schedule_batches"] and all(
+        snapshot_cache.table_version(rows[table]) == versions[table] for table in tables
+    ):
+        snapshot_cache.write(summary_id, rows)
+    return rows, "database"
+
+@router.get("/schedules/{summary_id}")
+def get_schedule(summary_id: int):
+    """
+    Batches and assignments of a generated schedule (see ``read_schedule``).
+    Plain ``def``: FastAPI runs it on a worker thread, so paging Supabase
+    never blocks the event loop.
+    """
+    start_exec = datetime.now()
+    tables, source = read_schedule(summary_id)
+    return {
+        "schedule_summary_id": summary_id,
+        "source": source,
+        "batches": tables["schedule_batches"],
+        "assignments": tables["schedule_assignments"],
+        "execution_time": (datetime.now() - start_exec).total_seconds()
+    }
+
+@router.get("/schedules/{summary_id}/batches")
+def get_schedule_batches(summary_id: int):
+    """Batches of a generated schedule only, for callers that do not need the assignments"""
+    start_exec = datetime.now()
+    tables, source = read_schedule(summary_id, ("schedule_batches",))
+    return {
+        "schedule_summary_id": summary_id,
+        "source": source,
+        "batches": tables["schedule_batches"],
+        "execution_time": (datetime.now() - start_exec).total_seconds()
+    }
+
+@router.get("/metrics")
+async def schedule_metrics():
+    """Admission limits, queue depth and counters for schedule generation"""
+    return {"admission": admission.metrics()}
@@ -0,0 +1,233 @@
+"""Local columnar snapshots of generated schedules
+
+Each schedule is written once to ``SCHEDULE_SNAPSHOT_DIR/<id>/`` as one
+``.npy`` array per column of its ``schedule_batches`` and
+``schedule_assignments`` rows, exactly as the database returned them
+(strings dictionary-encoded into a shared vocabulary in ``meta.json``,
+integer lists such as ``participant_ids`` flattened with offsets). Readers
+memory-map the arrays, so a repeated read costs a few page faults instead
+of paginating Supabase again.
+
+Every snapshot records a version per table (row count and highest id);
+callers compare it with the database before trusting a hit, since rows
+are only ever inserted or deleted. The cache is size-bounded
+(``SCHEDULE_SNAPSHOT_MAX_MB``): the least recently read snapshots are
+evicted first. Anything missing or unreadable is simply a cache miss; the
+database stays the source of truth.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = Path(os.getenv("SCHEDULE_SNAPSHOT_DIR", Path(__file__).parent.parent.parent / ".snapshots"))
+SNAPSHOT_MAX_MB = float(os.getenv("SCHEDULE_SNAPSHOT_MAX_MB", "256"))
+FORMAT_VERSION = 2
+
+TABLES = ("schedule_batches", "schedule_assignments")
+
+_lock = threading.Lock()
+
+Version = Tuple[int, Optional[int]]  # (row count, highest id)
+
+
+def table_version(rows: List[Dict]) -> Version:
+    """Version of a table's rows for one schedule, comparable with the database"""
+    ids = [row["id"] for row in rows if isinstance(row.get("id"), int)]
+    return len(rows), max(ids) if ids else None
+
+
+def _kind(values: List[Any]) -> str:
+    """Storage kind of a column: the narrowest encoding that round-trips every value"""
+    if all(isinstance(v, bool) for v in values):
+        return "bool"
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return "int"
+    if all(v is None or isinstance(v, str) for v in values):
+        return "str"
+    if all(
+        isinstance(v, list) and all(isinstance(x, int) and not isinstance(x, bool) for x in v)
+        for v in values
+    ):
+        return "int_list"
+    return "json"
+
+
+class _Encoder:
+    """Shared string vocabulary; code -1 stands for None"""
+
+    def __init__(self):
+        self.vocab: Dict[str, int] = {}
+
+    def codes(self, values) -> np.ndarray:
+        return np.fromiter(
+            (-1 if v is None else self.vocab.setdefault(v, len(self.vocab)) for v in values),
+            dtype=np.int32,
+        )
+
+    def encode(self, kind: str, values: List[Any]) -> Dict[str, np.ndarray]:
+        if kind == "bool":
+            return {"": np.array(values, dtype=bool)}
+        if kind == "int":
+            return {"": np.array(values, dtype=np.int64)}
+        if kind == "str":
+            return {"": self.codes(values)}
+        if kind == "int_list":
+            lengths = np.fromiter((len(v) for v in values), dtype=np.int64, count=len(values))
+            flat = np.fromiter((x for v in values for x in v), dtype=np.int64, count=int(lengths.sum()))
+            return {"": flat, ".offsets": np.concatenate(([0], np.cumsum(lengths)))}
+        return {"": self.codes(json.dumps(v) for v in values)}
+
+
+def _decode(kind: str, arrays: Dict[str, np.ndarray], strings: List[str]) -> List[Any]:
+    values = arrays[""]
+    if kind in ("bool", "int"):
+        return values.tolist()
+    if kind == "int_list":
+        flat = values.tolist()
+        offsets = arrays[".offsets"].tolist()
+        return [flat[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    decoded = [None if code < 0 else strings[code] for code in values.tolist()]
+    if kind == "json":
+        return [json.loads(v) for v in decoded]
+    return decoded
+
+
+class Snapshot:
+    """Memory-mapped columns of one schedule"""
+
+    __slots__ = ('summary_id', 'meta', 'arrays')
+
+    def __init__(self, summary_id: int, meta: Dict, arrays: Dict[str, np.ndarray]):
+        self.summary_id = summary_id
+        self.meta = meta
+        self.arrays = arrays
+
+    def version(self, table: str) -> Version:
+        count, max_id = self.meta["tables"][table]["version"]
+        return count, max_id
+
+    def rows(self, table: str) -> List[Dict]:
+        """The table's rows as they were written: same keys, key order, values and row order"""
+        info = self.meta["tables"][table]
+        names = [name for name, _ in info["columns"]]
+        columns = [
+            _decode(kind, {
+                suffix: self.arrays[f"{table}.{name}{suffix}"]
+                for suffix in ("", ".offsets") if f"{table}.{name}{suffix}" in self.arrays
+            }, self.meta["strings"])
+            for name, kind in info["columns"]
+        ]
+        return [dict(zip(names, values)) for values in zip(*columns)] if columns else [{}] * info["version"][0]
+
+
+def write(summary_id: int, tables: Dict[str, List[Dict]]):
+    """
+    Snapshot a persisted schedule.
+
+    Args:
+        summary_id: schedule_summary_id
+        tables: complete rows per table in TABLES, as returned by the
+            database (insert or select); they are stored ordered by id
+    """
+    try:
+        _write(summary_id, tables)
+    except Exception as e:
+        logger.error(f"❌ Failed to write schedule snapshot {summary_id}: {e}")
+
+
+def _write(summary_id: int, tables: Dict[str, List[Dict]]):
+    encoder = _Encoder()
+    arrays: Dict[str, np.ndarray] = {}
+    table_meta = {}
+    for table in TABLES:
+        rows = sorted(tables[table], key=lambda row: row.get("id") or 0)
+        names = list(rows[0].keys()) if rows else []
+        if any(list(row.keys()) != names for row in rows):
+            raise ValueError(f"{table} rows do not share one set of columns")
+        columns = []
+        for name in names:
+            values = [row[name] for row in rows]
+            kind = _kind(values)
+            for suffix, array in encoder.encode(kind, values).items():
+                arrays[f"{table}.{name}{suffix}"] = array
+            columns.append([name, kind])
+        table_meta[table] = {"columns": columns, "version": list(table_version(rows))}
+
+    # Write into a scratch directory and swap it in, so readers never see half a snapshot
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = SNAPSHOT_DIR / f".tmp-{summary_id}-{uuid.uuid4().hex[:8]}"
+    tmp.mkdir()
+    for name, values in arrays.items():
+        np.save(tmp / f"{name}.npy", values)
+    (tmp / "meta.json").write_text(json.dumps({
+        "version": FORMAT_VERSION,
+        "summary_id": summary_id,
+        "strings": list(encoder.vocab),
+        "tables": table_meta,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }))
+
+    target = SNAPSHOT_DIR / str(summary_id)
+    with _lock:
+        if target.exists():
+            shutil.rmtree(target, ignore_errors=True)
+        tmp.rename(target)
+    counts = ", ".join(f"{meta['version'][0]} {table}" for table, meta in table_meta.items())
+    logger.info(f"🗄️ Wrote schedule snapshot {summary_id} ({counts})")
+    _evict()
+
+
+def load(summary_id: int) -> Optional[Snapshot]:
+    """Memory-mapped snapshot, or None on a miss"""
+    target = SNAPSHOT_DIR / str(int(summary_id))
+    meta_path = target / "meta.json"
+    try:
+        meta = json.loads(meta_path.read_text())
+        if meta.get("version") != FORMAT_VERSION:
+            return None
+        arrays = {
+            path.name[:-len(".npy")]: np.load(path, mmap_mode="r", allow_pickle=False)
+            for path in target.glob("*.npy")
+        }
+        # Reads refresh recency for eviction
+        os.utime(meta_path)
+        return Snapshot(int(summary_id), meta, arrays)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def evict(summary_id: int):
+    """Drop one snapshot, e.g. when its schedule no longer exists or changed"""
+    with _lock:
+        shutil.rmtree(SNAPSHOT_DIR / str(int(summary_id)), ignore_errors=True)
+
+
+def _evict():
+    """Remove least recently read snapshots until the cache fits its size cap"""
+    limit = SNAPSHOT_MAX_MB * 1024 * 1024
+    with _lock:
+        entries = []
+        for entry in SNAPSHOT_DIR.iterdir():
+            meta_path = entry / "meta.json"
+            if entry.name.startswith(".") or not meta_path.exists():
+                continue
+            size = sum(f.stat().st_size for f in entry.iterdir())
+            entries.append((meta_path.stat().st_mtime, size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= limit:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            logger.info(f"🗄️ Evicted schedule snapshot {entry.name}")
@@ -96,7 +96,8 @@ async def http_exception_handler(request, exc):
     logger.error(f"HTTP Exception: {exc.detail}")
     return JSONResponse(
         status_code=exc.status_code,
-        content={"error": exc.detail, "success": False}
+        content={"error": exc.detail, "success": False},
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
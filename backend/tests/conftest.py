@@ -0,0 +1,206 @@
+import itertools
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make the ``api`` package importable when pytest runs from the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# routes builds its Supabase client at import time; tests swap it for FakeSupabase
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test.test.test")
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """The subset of the postgrest query builder used by routes, over in-memory rows"""
+
+    def __init__(self, client: "FakeSupabase", table: str):
+        self.client = client
+        self.table = table
+        self.filters = []
+        self.op = "select"
+        self.payload = None
+        self.columns = "*"
+        self.count = None
+        self.ordering = None
+        self.bounds = None
+        self.max_rows = None
+
+    def select(self, columns="*", count=None):
+        self.columns, self.count = columns, count
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def or_(self, expression):
+        assert expression == "is_pwd.is.null,is_pwd.eq.false"
+        self.filters.append(lambda row: not row.get("is_pwd"))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) >= value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row.get(column) <= value)
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering = (column, desc)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def limit(self, rows):
+        self.max_rows = rows
+        return self
+
+    def insert(self, payload):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def update(self, payload):
+        self.op, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def execute(self):
+        self.client.calls.append((self.table, self.op))
+        failure = self.client.failures.get((self.table, self.op))
+        if failure:
+            raise failure
+        rows = self.client.tables.setdefault(self.table, [])
+        if self.op == "insert":
+            inserted = []
+            for row in self.payload if isinstance(self.payload, list) else [self.payload]:
+                row = {**row, "id": next(self.client.ids)}
+                rows.append(row)
+                inserted.append(dict(row))
+            return FakeResponse(inserted)
+
+        matched = [row for row in rows if all(f(row) for f in self.filters)]
+        if self.op == "update":
+            for row in matched:
+                row.update(self.payload)
+            return FakeResponse([dict(row) for row in matched])
+        if self.op == "delete":
+            for row in matched:
+                rows.remove(row)
+            return FakeResponse(matched)
+
+        total = len(matched)
+        if self.ordering:
+            column, desc = self.ordering
+            matched = sorted(matched, key=lambda row: row.get(column), reverse=desc)
+        if self.bounds:
+            matched = matched[self.bounds[0]:self.bounds[1] + 1]
+        if self.max_rows is not None:
+            matched = matched[:self.max_rows]
+        if self.columns != "*":
+            names = [name.strip() for name in self.columns.split(",")]
+            matched = [{name: row.get(name) for name in names} for row in matched]
+        else:
+            matched = [dict(row) for row in matched]
+        return FakeResponse(matched, total if self.count else None)
+
+
+class FakeSupabase:
+    """In-memory stand-in for the Supabase client: ``tables`` holds rows, ``failures`` injects errors"""
+
+    def __init__(self):
+        self.tables = {}
+        self.ids = itertools.count(1)
+        self.calls = []
+        self.failures = {}  # (table, op) -> exception raised by execute()
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rows(self, table: str, **filters):
+        return [
+            row for row in self.tables.get(table, [])
+            if all(row.get(column) == value for column, value in filters.items())
+        ]
+
+
+@pytest.fixture
+def fake_sb():
+    return FakeSupabase()
+
+
+@pytest.fixture
+def routes(fake_sb, monkeypatch, tmp_path):
+    """``routes`` wired to a FakeSupabase, a fresh occupancy index and a scratch snapshot dir"""
+    from api.schedule import routes, snapshot_cache
+    from api.schedule.occupancy import RoomOccupancyIndex
+
+    monkeypatch.setattr(routes, "sb", fake_sb)
+    monkeypatch.setattr(routes, "occupancy_index", RoomOccupancyIndex())
+    monkeypatch.setattr(snapshot_cache, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    return routes
+
+
+def room_rows(group_id: int = 1, capacities=(10, 8, 10, 6)):
+    """Campus rows: the first half on the 1st floor (1xx), the rest on the 2nd (2xx)"""
+    half = len(capacities) // 2
+    return [
+        {
+            "upload_group_id": group_id, "campus": "Main", "building": "A",
+            "room": f"{1 if i < half else 2}0{i % half + 1}", "capacity": capacity,
+        }
+        for i, capacity in enumerate(capacities)
+    ]
+
+
+def participant_rows(group_id: int = 2, count: int = 60, pwd_every: int = 10):
+    return [
+        {"upload_group_id": group_id, "is_pwd": i % pwd_every == 0}
+        for i in range(count)
+    ]
+
+
+def _schedule_request(**overrides):
+    request = dict(
+        event_name="Exam", event_type="exam", schedule_date="2026-01-05",
+        start_date="2026-01-05", end_date="2026-01-09", start_time="08:00", end_time="12:00",
+        duration_per_batch=60, campus_group_id=1, participant_group_id=2,
+        exclude_lunch_break=False,
+    )
+    request.update(overrides)
+    return request
+
+
+@pytest.fixture
+def schedule_request():
+    """Builds a ScheduleRequest body for the seeded groups: four 1-hour slots a day, Monday to Friday"""
+    return _schedule_request
+
+
+@pytest.fixture
+def seeded(fake_sb):
+    """A campus group (id 1) with four rooms and a participant group (id 2) of 60"""
+    for row in room_rows():
+        fake_sb.table("campuses").insert(row).execute()
+    for row in participant_rows():
+        fake_sb.table("participants").insert(row).execute()
+    return fake_sb
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from api.schedule.admission import AdmissionController, AdmissionRejected
+
+
+def estimate(mb: float):
+    async def compute():
+        return mb
+    return compute
+
+
+async def hold(controller: AdmissionController, release: asyncio.Event, ticket_id=None, mb: float = 10):
+    async with controller.admit(estimate(mb), ticket_id):
+        await release.wait()
+
+
+def test_queue_full_rejects_with_position():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout_s=5)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, release, "first"))
+        waiting = asyncio.create_task(hold(controller, release, "second"))
+        await asyncio.sleep(0)
+        assert controller.status("first")["state"] == "running"
+        assert controller.status("second")["position"] == 1
+
+        estimated = []
+
+        async def tracked():
+            estimated.append(True)
+            return 10
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit(tracked, "third"):
+                pass
+        assert rejected.value.status_code == 429
+        assert rejected.value.position == 2
+        assert rejected.value.ticket_id == "third"
+        assert rejected.value.retry_after >= 1
+        # A full queue turns requests away before estimating them
+        assert not estimated
+
+        release.set()
+        await asyncio.gather(running, waiting)
+        assert controller.running == 0
+        assert controller.running_mb == 0
+        assert not controller.tickets
+        assert controller.counters["completed"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_wait_timeout_rejects_and_leaves_queue():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=2, queue_timeout_s=0.05)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit(estimate(10), "late"):
+                pass
+        assert rejected.value.status_code == 503
+        assert rejected.value.position == 1
+        assert not controller.waiting
+        assert controller.status("late") is None
+        assert controller.counters["rejected_timeout"] == 1
+
+        release.set()
+        await running
+        assert controller.running == 0
+
+    asyncio.run(scenario())
+
+
+def test_memory_budget_serializes_and_oversized_runs_alone():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=4, max_queue=4, memory_budget_mb=100, queue_timeout_s=5)
+        release = asyncio.Event()
+        big = asyncio.create_task(hold(controller, release, "big", mb=500))
+        small = asyncio.create_task(hold(controller, release, "small", mb=10))
+        await asyncio.sleep(0)
+        assert controller.status("big")["state"] == "running"
+        assert controller.status("small")["state"] == "queued"
+
+        release.set()
+        await asyncio.gather(big, small)
+        assert controller.counters["admitted"] == 2
+
+    asyncio.run(scenario())
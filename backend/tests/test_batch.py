@@ -0,0 +1,77 @@
+import pytest
+from fastapi import HTTPException
+
+
+def batch_request(routes, schedule_request, *events, **overrides):
+    return routes.BatchScheduleRequest(
+        events=[routes.ScheduleRequest(**schedule_request(**event)) for event in events], **overrides
+    )
+
+
+def rejection(routes, req) -> str:
+    with pytest.raises(HTTPException) as rejected:
+        routes.validate_batch(req)
+    assert rejected.value.status_code == 400
+    return rejected.value.detail
+
+
+def test_empty_and_oversized_batches_are_rejected(routes, schedule_request, monkeypatch):
+    assert rejection(routes, batch_request(routes, schedule_request)) == "No events to schedule"
+
+    monkeypatch.setattr(routes, "MAX_BATCH_EVENTS", 2)
+    events = [{"start_date": f"2026-01-0{5 + i}", "end_date": f"2026-01-0{5 + i}"} for i in range(3)]
+    assert "At most 2" in rejection(routes, batch_request(routes, schedule_request, *events))
+
+
+def test_same_group_at_overlapping_times_is_rejected(routes, schedule_request):
+    req = batch_request(
+        routes, schedule_request,
+        {"event_name": "Morning"}, {"event_name": "Late", "start_time": "11:00", "end_time": "13:00"},
+    )
+    assert "'Morning' and 'Late'" in rejection(routes, req)
+
+
+@pytest.mark.parametrize("second", [
+    {"start_date": "2026-01-12", "end_date": "2026-01-16"},  # later week
+    {"start_time": "12:00", "end_time": "14:00"},  # touching hours
+    {"participant_group_id": 3},  # another group
+])
+def test_disjoint_events_are_accepted(routes, schedule_request, second):
+    routes.validate_batch(batch_request(routes, schedule_request, {}, second))
+
+
+def test_events_of_a_batch_never_share_seats(routes, seeded, schedule_request):
+    for _ in range(60):
+        seeded.table("participants").insert({"upload_group_id": 3, "is_pwd": False}).execute()
+    # Two groups at the same times: 120 people for 136 seats on one day
+    req = batch_request(
+        routes, schedule_request,
+        {"event_name": "Group 2", "end_date": "2026-01-05"},
+        {"event_name": "Group 3", "end_date": "2026-01-05", "participant_group_id": 3},
+        avoid_conflicts=False,
+    )
+    result = routes.run_schedule_batch(req)
+
+    assert result.scheduled_events == 2
+    assert [r["scheduled_count"] for r in result.results] == [60, 60]
+    assert len(seeded.rows("schedule_summary")) == 2
+    seats = {}
+    for batch in seeded.rows("schedule_batches"):
+        key = (batch["room"], batch["batch_date"], batch["start_time"])
+        seats[key] = seats.get(key, 0) + batch["participant_count"]
+    capacities = {row["room"]: row["capacity"] for row in seeded.rows("campuses")}
+    assert all(count <= capacities[room] for (room, _, _), count in seats.items())
+
+
+def test_failed_batch_write_rolls_back_every_event(routes, seeded, schedule_request):
+    seeded.failures[("schedule_batches", "insert")] = RuntimeError("insert failed")
+    req = batch_request(
+        routes, schedule_request,
+        {"end_date": "2026-01-05"}, {"start_date": "2026-01-06", "end_date": "2026-01-06"},
+    )
+    with pytest.raises(HTTPException) as failed:
+        routes.run_schedule_batch(req)
+
+    assert failed.value.status_code == 500
+    assert not seeded.rows("schedule_summary")
+    assert len(routes.occupancy_index) == 0
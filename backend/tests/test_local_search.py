@@ -0,0 +1,139 @@
+import random
+from collections import Counter
+
+import pytest
+
+from api.schedule.local_search import LocalSearchOptimizer
+
+DAYS = ["2026-01-05", "2026-01-06", "2026-01-07"]
+ROOMS = {"C|A|101": 10, "C|A|102": 8, "C|A|201": 10, "C|A|202": 6}
+FIRST_FLOOR = {"C|A|101", "C|A|102"}
+SLOTS = 3
+
+
+def scattered_schedule(seed: int):
+    """A deliberately poor schedule: partly filled batches spread over every day"""
+    rng = random.Random(seed)
+    capacity = {(day, slot, room): cap for day in DAYS for slot in range(SLOTS) for room, cap in ROOMS.items()}
+    bins = {}
+    pid = 0
+    for key, cap in capacity.items():
+        if rng.random() < 0.5:
+            continue
+        members = []
+        for _ in range(rng.randint(1, cap)):
+            pid += 1
+            members.append((pid, rng.random() < 0.2))
+        bins[key] = members
+    free = {key: cap - len(bins.get(key, [])) for key, cap in capacity.items()}
+    return capacity, bins, free
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("prioritize_pwd", [True, False])
+def test_ledger_invariants_and_objective(seed, prioritize_pwd):
+    capacity, bins, free = scattered_schedule(seed)
+    participants = Counter(member for members in bins.values() for member in members)
+
+    optimizer = LocalSearchOptimizer(bins, free, FIRST_FLOOR, prioritize_pwd, seed=seed)
+    before = optimizer.objective()
+    report = optimizer.run(budget_seconds=1.0)
+    after = optimizer.objective()
+
+    assert after <= before
+    assert tuple(report["after"].values()) == after
+
+    # The ledger and the bins agree, and no room-slot is overfilled
+    for key, cap in capacity.items():
+        assert free[key] >= 0
+        assert free[key] + len(bins.get(key, [])) == cap
+    assert all(bins.values())
+
+    # Every participant is still seated exactly once
+    assert Counter(member for members in bins.values() for member in members) == participants
+
+
+def test_clears_days_when_capacity_allows():
+    capacity = {(day, 0, "C|A|101"): 10 for day in DAYS}
+    bins = {(day, 0, "C|A|101"): [(i, False)] for i, day in enumerate(DAYS)}
+    free = {key: cap - len(bins[key]) for key, cap in capacity.items()}
+
+    optimizer = LocalSearchOptimizer(bins, free, {"C|A|101"}, prioritize_pwd=True)
+    optimizer.run(budget_seconds=1.0)
+
+    assert optimizer.objective() == (0, 1, 1)
+
+
+def greedy_scheduler(routes, seeded, **overrides):
+    scheduler = routes.OptimizedScheduler(**overrides)
+    scheduler.schedule(
+        rooms=seeded.rows("campuses"), participants=seeded.rows("participants"),
+        start_date="2026-01-05", end_date="2026-01-07", start_time="08:00", end_time="12:00",
+        duration_per_batch=60, exclude_lunch_break=False,
+    )
+    return scheduler
+
+
+def test_improve_reports_the_greedy_batches_it_started_from(routes, seeded):
+    scheduler = greedy_scheduler(routes, seeded)
+    greedy_batches = len(scheduler.batches)
+    capacities = scheduler.room_capacities()
+
+    report = scheduler.improve(budget_ms=500)
+
+    assert report["accepted"]
+    assert report["before"]["batches"] == greedy_batches
+    assert report["merged_batches"] <= greedy_batches
+    assert tuple(report["after"].values()) <= tuple(report["before"].values())
+    assert len(scheduler.batches) == report["after"]["batches"]
+
+    # Everyone is seated once and no room-slot is overfilled
+    seated = Counter(a["participant_id"] for a in scheduler.assignments)
+    assert len(seated) == 60 and set(seated.values()) == {1}
+    for batch in scheduler.batches:
+        key = f"{batch['campus']}|{batch['building']}|{batch['room']}"
+        assert batch["participant_count"] <= capacities[key]
+    assert [b["batch_number"] for b in scheduler.batches] == list(range(1, len(scheduler.batches) + 1))
+
+
+def test_run_schedule_searches_outside_the_booking_lock(routes, seeded, schedule_request, monkeypatch):
+    lock_free = []
+    search = routes.LocalSearchOptimizer.run
+
+    def probing_run(optimizer, budget_seconds):
+        acquired = routes.booking_lock.acquire(blocking=False)
+        lock_free.append(acquired)
+        if acquired:
+            routes.booking_lock.release()
+        return search(optimizer, budget_seconds)
+
+    monkeypatch.setattr(routes.LocalSearchOptimizer, "run", probing_run)
+    result = routes.run_schedule(routes.ScheduleRequest(**schedule_request(optimize_budget_ms=200)))
+
+    assert lock_free == [True]
+    assert result.optimization["accepted"]
+    assert len(seeded.rows("schedule_batches")) == result.total_batches
+
+
+def test_improved_batches_that_no_longer_fit_are_declined(routes, seeded, schedule_request, monkeypatch):
+    search = routes.LocalSearchOptimizer.run
+    index = routes.occupancy_index
+
+    def contended_run(optimizer, budget_seconds):
+        report = search(optimizer, budget_seconds)
+        # Another run fills every room-slot the improved layout wants
+        for day, slot_idx, key in optimizer.bins:
+            campus, building, room = key.split("|")
+            start = f"{8 + slot_idx:02d}:00"
+            index.reserve([{"campus": campus, "building": building, "room": room, "batch_date": day,
+                            "start_time": start, "end_time": f"{9 + slot_idx:02d}:00", "participant_count": 10}])
+        return report
+
+    monkeypatch.setattr(routes.LocalSearchOptimizer, "run", contended_run)
+    result = routes.run_schedule(routes.ScheduleRequest(**schedule_request(optimize_budget_ms=200)))
+
+    assert not result.optimization["accepted"]
+    assert result.total_batches == result.optimization["before"]["batches"]
+    batches = seeded.rows("schedule_batches")
+    assert len(batches) == result.total_batches
+    assert sum(b["participant_count"] for b in batches) == result.scheduled_count == 60
@@ -0,0 +1,35 @@
+import pytest
+from pydantic import ValidationError
+
+
+def horizon_request(routes, **overrides):
+    return routes.HorizonRequest(**{
+        "start_date": "2026-01-05", "start_time": "08:00", "end_time": "12:00", "duration_per_batch": 60,
+        "campus_group_id": 1, "participant_group_id": 2, "exclude_lunch_break": False, **overrides,
+    })
+
+
+def test_earliest_end_date(routes, seeded):
+    # One 1-hour slot a day seats 34: 60 participants need two days
+    result = routes.min_horizon(horizon_request(routes, end_time="09:00"))
+    assert result["mode"] == "end_date" and result["feasible"]
+    assert result["days"] == 2 and result["min_end_date"] == "2026-01-06"
+    assert result["capacity"] == 68
+
+
+def test_fewest_slots_per_day(routes, seeded):
+    result = routes.min_horizon(horizon_request(routes, end_date="2026-01-06"))
+    assert result["mode"] == "slots" and result["feasible"]
+    assert result["min_slots_per_day"] == 1 and result["end_time"] == "09:00"
+
+
+@pytest.mark.parametrize("max_days", [0, 367, 100000])
+def test_max_days_is_bounded(routes, max_days):
+    with pytest.raises(ValidationError):
+        horizon_request(routes, max_days=max_days)
+
+
+def test_infeasible_within_max_days(routes, seeded):
+    result = routes.min_horizon(horizon_request(routes, end_time="09:00", max_days=1))
+    assert not result["feasible"] and result["min_end_date"] is None
+    assert result["warnings"] == ["Does not fit within max_days (1)"]
@@ -0,0 +1,192 @@
+import random
+import threading
+
+from api.schedule.occupancy import RoomOccupancyIndex, _IntervalArray, room_key
+
+ROOM = room_key("Main", "A", "101")
+DAY = "2026-01-05"
+
+
+def batch(start: str, end: str, seats: int, day: str = DAY):
+    return {
+        "campus": "Main", "building": "A", "room": "101",
+        "batch_date": day, "start_time": start, "end_time": end,
+        "participant_count": seats,
+    }
+
+
+def brute_peak(intervals, start, end):
+    return max(
+        (sum(seats for s, e, seats in intervals if s <= minute < e) for minute in range(start, end)),
+        default=0,
+    )
+
+
+def test_peak_empty():
+    assert _IntervalArray().peak(0, 60) == 0
+
+
+def test_peak_touching_intervals_do_not_overlap():
+    intervals = _IntervalArray()
+    intervals.insert(480, 540, 10, 1)
+    intervals.insert(540, 600, 7, 2)
+    assert intervals.peak(480, 600) == 10
+    assert intervals.peak(540, 600) == 7
+    assert intervals.peak(600, 660) == 0
+
+
+def test_peak_counts_long_interval_starting_before_window():
+    intervals = _IntervalArray()
+    intervals.insert(0, 600, 5, 1)
+    intervals.insert(500, 510, 3, 2)
+    assert intervals.peak(505, 506) == 8
+    assert intervals.peak(520, 530) == 5
+
+
+def test_peak_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(200):
+        intervals = _IntervalArray()
+        raw = []
+        for _ in range(rng.randint(0, 12)):
+            start = rng.randint(0, 100)
+            end = start + rng.randint(1, 40)
+            seats = rng.randint(1, 9)
+            intervals.insert(start, end, seats, None)
+            raw.append((start, end, seats))
+        start = rng.randint(0, 120)
+        end = start + rng.randint(1, 40)
+        assert intervals.peak(start, end) == brute_peak(raw, start, end)
+
+
+def test_reservation_confirm_release():
+    index = RoomOccupancyIndex()
+    token = index.reserve([batch("08:00", "09:00", 10)])
+    assert index.booked(ROOM, DAY, 480, 540) == 10
+    assert index.summary_ids() == set()
+
+    index.confirm(token, 42)
+    assert index.summary_ids() == {42}
+    # Releasing a confirmed reservation changes nothing
+    index.release(token)
+    assert index.booked(ROOM, DAY, 480, 540) == 10
+
+    other = index.reserve([batch("08:30", "09:30", 4)])
+    assert index.booked(ROOM, DAY, 480, 600) == 14
+    index.release(other)
+    assert index.booked(ROOM, DAY, 480, 600) == 10
+
+
+def test_replace_days_does_not_double_count_confirmed_batches():
+    index = RoomOccupancyIndex()
+    index.confirm(index.reserve([batch("08:00", "09:00", 10)]), 42)
+    pending = index.reserve([batch("08:00", "09:00", 3)])
+
+    # The database now also returns the confirmed batch
+    index.replace_days([DAY], [{**batch("08:00", "09:00", 10), "schedule_summary_id": 42}])
+    assert index.booked(ROOM, DAY, 480, 540) == 13
+    assert DAY in index.loaded_days
+
+    index.release(pending)
+    assert index.booked(ROOM, DAY, 480, 540) == 10
+
+
+def test_summary_ids_by_day_and_discard():
+    index = RoomOccupancyIndex()
+    index.add_batch(batch("08:00", "09:00", 5), 1)
+    index.add_batch(batch("08:00", "09:00", 5, day="2026-01-06"), 2)
+    assert index.summary_ids([DAY]) == {1}
+
+    index.discard_summaries({1})
+    assert index.booked(ROOM, DAY, 480, 540) == 0
+    assert index.summary_ids() == {2}
+    assert len(index) == 1
+
+
+def test_rows_of_a_run_still_persisting_are_not_counted_twice():
+    index = RoomOccupancyIndex()
+    token = index.reserve([batch("08:00", "09:00", 10)])
+    index.bind(token, 42)
+    persisted = {**batch("08:00", "09:00", 10), "schedule_summary_id": 42}
+
+    # Another run refreshes the day after run 42 wrote its batches, before it confirmed
+    index.replace_days([DAY], [persisted])
+    assert index.booked(ROOM, DAY, 480, 540) == 10
+    index.confirm(token, 42)
+    assert index.booked(ROOM, DAY, 480, 540) == 10
+    index.replace_days([DAY], [persisted], read_at=index.loaded_days[DAY] + 1)
+    assert index.booked(ROOM, DAY, 480, 540) == 10
+
+
+def test_released_run_rows_count_again_if_cleanup_failed():
+    index = RoomOccupancyIndex()
+    token = index.reserve([batch("08:00", "09:00", 10)])
+    index.bind(token, 42)
+    index.release(token)
+    assert index.booked(ROOM, DAY, 480, 540) == 0
+
+    index.replace_days([DAY], [{**batch("08:00", "09:00", 10), "schedule_summary_id": 42}])
+    assert index.booked(ROOM, DAY, 480, 540) == 10
+
+
+def test_replace_days_ignores_reads_older_than_the_last_refresh():
+    index = RoomOccupancyIndex()
+    index.replace_days([DAY], [{**batch("08:00", "09:00", 5), "schedule_summary_id": 7}], read_at=2.0)
+    index.replace_days([DAY], [], read_at=1.0)
+    assert index.booked(ROOM, DAY, 480, 540) == 5
+
+
+def test_load_occupancy_reads_outside_the_index_lock(routes, fake_sb):
+    fake_sb.tables["schedule_batches"] = [{**batch("08:00", "09:00", 4), "id": 1, "schedule_summary_id": 7}]
+    fake_sb.tables["schedule_summary"] = [{"id": 7}]
+    index = routes.occupancy_index
+    lock_free = []
+
+    def probe():
+        acquired = index.lock.acquire(blocking=False)
+        lock_free.append(acquired)
+        if acquired:
+            index.lock.release()
+
+    table = fake_sb.table
+
+    def probing_table(name):
+        prober = threading.Thread(target=probe)
+        prober.start()
+        prober.join()
+        return table(name)
+
+    fake_sb.table = probing_table
+    routes.load_occupancy(DAY, DAY)
+    assert index.booked(ROOM, DAY, 480, 540) == 4
+    routes.load_occupancy(DAY, DAY)  # warm: only the deletion check queries
+    assert lock_free and all(lock_free)
+
+
+def test_load_occupancy_with_a_run_between_write_and_confirm(routes, fake_sb):
+    index = routes.occupancy_index
+    token = index.reserve([batch("08:00", "09:00", 10)])
+    index.bind(token, 42)
+    fake_sb.tables["schedule_summary"] = [{"id": 42}]
+    fake_sb.tables["schedule_batches"] = [{**batch("08:00", "09:00", 10), "id": 1, "schedule_summary_id": 42}]
+
+    routes.load_occupancy(DAY, DAY)
+    index.confirm(token, 42)
+    assert index.booked(ROOM, DAY, 480, 540) == 10
+
+
+def test_swap_checks_capacity_without_counting_its_own_seats():
+    index = RoomOccupancyIndex()
+    token = index.reserve([batch("08:00", "09:00", 6)])
+    index.reserve([batch("09:00", "10:00", 4)])
+
+    # Moving the reservation within the same slot only competes with others
+    assert index.swap(token, [batch("08:00", "09:00", 10)], {ROOM: 10})
+    assert index.booked(ROOM, DAY, 480, 540) == 10
+    assert index.booked(ROOM, DAY, 480, 540, exclude=token) == 0
+
+    assert not index.swap(token, [batch("09:00", "10:00", 7)], {ROOM: 10})
+    assert index.booked(ROOM, DAY, 480, 540) == 10
+    assert index.swap(token, [batch("09:00", "10:00", 6)], {ROOM: 10})
+    assert index.booked(ROOM, DAY, 480, 600) == 10
+    assert index.booked(ROOM, DAY, 480, 540) == 0
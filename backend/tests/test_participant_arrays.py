@@ -0,0 +1,71 @@
+import numpy as np
+
+
+def test_from_rows_treats_missing_pwd_as_false(routes):
+    participants = routes.ParticipantArrays.from_rows([
+        {"id": 3, "is_pwd": True}, {"id": 1, "is_pwd": None}, {"id": 2},
+    ])
+    assert participants.ids.dtype == np.int64
+    assert participants.ids.tolist() == [3, 1, 2]
+    assert participants.pwd.tolist() == [True, False, False]
+
+
+def test_from_pages_concatenates_in_order(routes):
+    pages = [[{"id": 1, "is_pwd": False}, {"id": 2, "is_pwd": True}], [{"id": 3, "is_pwd": False}]]
+    participants = routes.ParticipantArrays.from_pages(iter(pages))
+    assert participants.ids.tolist() == [1, 2, 3]
+    assert participants.pwd.tolist() == [False, True, False]
+
+    empty = routes.ParticipantArrays.from_pages(iter(()))
+    assert len(empty) == 0 and empty.ids.dtype == np.int64 and empty.pwd.dtype == bool
+
+
+def test_slices_are_views(routes):
+    participants = routes.ParticipantArrays.from_rows([{"id": i, "is_pwd": False} for i in range(10)])
+    window = participants[2:5]
+    assert window.ids.tolist() == [2, 3, 4]
+    assert np.shares_memory(window.ids, participants.ids)
+
+
+def test_fetch_participants_selects_only_id_and_pwd(routes, seeded):
+    selected = []
+    table = seeded.table
+
+    def recording_table(name):
+        query = table(name)
+        select = query.select
+
+        def recording_select(columns="*", **kwargs):
+            selected.append((name, columns))
+            return select(columns, **kwargs)
+
+        query.select = recording_select
+        return query
+
+    seeded.table = recording_table
+    participants = routes.fetch_participants(2)
+    assert len(participants) == 60
+    assert int(participants.pwd.sum()) == 6
+    assert selected == [("participants", routes.PARTICIPANT_COLUMNS)]
+
+
+def test_scheduler_gives_the_same_result_for_rows_and_arrays(routes, seeded):
+    rooms = seeded.rows("campuses")
+    rows = seeded.rows("participants")
+
+    def run(participants):
+        scheduler = routes.OptimizedScheduler()
+        result = scheduler.schedule(
+            rooms=rooms, participants=participants, start_date="2026-01-05", end_date="2026-01-06",
+            start_time="08:00", end_time="12:00", duration_per_batch=60, exclude_lunch_break=False,
+        )
+        return result, scheduler.assignments
+
+    from_rows, assignments_from_rows = run(rows)
+    from_arrays, assignments_from_arrays = run(routes.ParticipantArrays.from_rows(rows))
+    assert from_rows["batches"] == from_arrays["batches"]
+    assert assignments_from_rows == assignments_from_arrays
+    assert from_arrays["scheduled_count"] == 60
+    # PWD are seated first, on the 1st floor
+    pwd_ids = {row["id"] for row in rows if row["is_pwd"]}
+    assert all(a["is_first_floor"] for a in assignments_from_arrays if a["participant_id"] in pwd_ids)
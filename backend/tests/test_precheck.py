@@ -0,0 +1,82 @@
+from datetime import date
+
+DAY = "2026-01-05"
+
+
+def processed_rooms(routes, rooms):
+    return routes.OptimizedScheduler()._process_rooms(rooms)
+
+
+def test_smallest_fitting(routes):
+    for target in range(1, 21):
+        assert routes.smallest_fitting(1, 20, lambda n: n >= target) == target
+
+
+def test_capacity_calendar_subtracts_booked_seats(routes, seeded):
+    first_floor, all_rooms = processed_rooms(routes, seeded.rows("campuses"))
+    slots = routes.OptimizedScheduler._generate_slots("08:00", "10:00", 60, False, "12:00", "13:00")
+
+    assert routes.CapacityCalendar(first_floor, all_rooms, slots).capacity([DAY, "2026-01-06"], 2) == (136, 72)
+
+    index = routes.occupancy_index
+    index.reserve([{"campus": "Main", "building": "A", "room": "101", "batch_date": DAY,
+                    "start_time": "08:00", "end_time": "09:00", "participant_count": 4}])
+    calendar = routes.CapacityCalendar(first_floor, all_rooms, slots, index)
+    assert calendar.day(DAY) == ([30, 34], [14, 18])
+    assert calendar.capacity([DAY], 1) == (30, 14)
+    assert calendar.capacity(["2026-01-06"], 2) == (68, 36)
+
+
+def test_free_seat_prefix_doubles_until_it_fits(routes, seeded):
+    first_floor, all_rooms = processed_rooms(routes, seeded.rows("campuses"))
+    slots = routes.OptimizedScheduler._generate_slots("08:00", "09:00", 60, False, "12:00", "13:00")
+
+    prefix, horizon = routes.free_seat_prefix(
+        first_floor, all_rooms, slots, date(2026, 1, 5), lambda free: free[0] >= 34 * 5, 366, False
+    )
+    assert horizon == 8
+    assert prefix[5] == (170, 90)
+    assert routes.smallest_fitting(1, horizon, lambda d: prefix[d][0] >= 34 * 5) == 5
+
+
+def test_free_seat_prefix_gives_up_when_no_day_could_fit(routes, seeded):
+    first_floor, all_rooms = processed_rooms(routes, seeded.rows("campuses"))
+    slots = routes.OptimizedScheduler._generate_slots("08:00", "09:00", 60, False, "12:00", "13:00")
+
+    prefix, horizon = routes.free_seat_prefix(
+        [], all_rooms, slots, date(2026, 1, 5), lambda free: free[1] >= 1, 366, True
+    )
+    assert horizon == 1 and len(prefix) == 2
+    assert seeded.calls.count(("schedule_batches", "select")) == 1
+
+
+def precheck_request(routes, **overrides):
+    return routes.PrecheckRequest(**{
+        "start_date": DAY, "end_date": DAY, "start_time": "08:00", "end_time": "12:00",
+        "duration_per_batch": 60, "campus_group_id": 1, "participant_group_id": 2,
+        "exclude_lunch_break": False, **overrides,
+    })
+
+
+def test_precheck_from_aggregates(routes, seeded):
+    result = routes.precheck_schedule(precheck_request(routes))
+
+    assert result["feasible"] and result["pwd_first_floor_feasible"]
+    assert result["participants"] == 60 and result["pwd_participants"] == 6
+    assert result["total_capacity"] == 136 and result["first_floor_capacity"] == 72
+    assert result["min_end_date"] == result["min_end_date_pwd_first_floor"] == DAY
+
+
+def test_precheck_without_first_floor_rooms_stops_the_pwd_search(routes, fake_sb):
+    for room, capacity in (("201", 10), ("202", 6)):
+        fake_sb.table("campuses").insert({
+            "upload_group_id": 1, "campus": "Main", "building": "A", "room": room, "capacity": capacity,
+        }).execute()
+    for i in range(40):
+        fake_sb.table("participants").insert({"upload_group_id": 2, "is_pwd": i < 2}).execute()
+
+    result = routes.precheck_schedule(precheck_request(routes))
+
+    assert result["min_end_date"] == DAY
+    assert result["min_end_date_pwd_first_floor"] is None
+    assert fake_sb.calls.count(("schedule_batches", "select")) <= 2
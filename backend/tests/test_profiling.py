@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException, Response
+
+from api.schedule import profiling
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "SAMPLE_INTERVAL_MS", 1)
+    return tmp_path
+
+
+def spin(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampler_only_records_the_run_and_the_threads_it_follows():
+    stop = threading.Event()
+    # Another request's thread, busy inside this package too
+    bystander = threading.Thread(
+        target=lambda: [profiling.call("other", None, spin, 0.01) for _ in iter(stop.is_set, True)],
+        name="bystander"
+    )
+    bystander.start()
+
+    def run():
+        helper = threading.Thread(target=spin, args=(0.2,), name="schedule-writer")
+        helper.start()
+        profiling.follow(helper)
+        spin(0.2)
+        helper.join()
+
+    try:
+        with profiling.capture("test", "sample") as meta:
+            run()
+    finally:
+        stop.set()
+        bystander.join()
+
+    profile = (profiling.PROFILE_DIR / meta["file"]).read_text()
+    assert '"name": "schedule-writer"' in profile
+    assert f'"name": "{threading.current_thread().name}"' in profile
+    assert "bystander" not in profile
+    assert meta["samples"] > 0
+
+
+def test_follow_outside_a_capture_is_a_no_op():
+    thread = threading.Thread(target=lambda: None)
+    thread.start()
+    profiling.follow(thread)
+    thread.join()
+
+
+def test_header_needs_authorization():
+    assert profiling.requested_mode("cprofile", authorized=True) == "cprofile"
+    assert profiling.requested_mode("sample", authorized=False) is None
+    assert profiling.requested_mode("off", authorized=True) is None
+
+
+def test_admin_token_checks(routes, monkeypatch):
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", None)
+    assert not routes.is_admin("anything")
+    with pytest.raises(HTTPException) as disabled:
+        routes.require_admin("anything")
+    assert disabled.value.status_code == 403
+
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "s3cret")
+    assert routes.is_admin("s3cret")
+    assert not routes.is_admin("wrong") and not routes.is_admin(None)
+    routes.require_admin("s3cret")
+
+
+@pytest.mark.parametrize("endpoint", ["get_profiling", "list_profiles"])
+def test_admin_endpoints_reject_missing_token(routes, monkeypatch, endpoint):
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "s3cret")
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(getattr(routes, endpoint)(x_admin_token=None))
+    assert rejected.value.status_code == 403
+
+
+def test_profile_header_requires_admin(routes, monkeypatch, schedule_request):
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "s3cret")
+    req = routes.ScheduleRequest(**schedule_request())
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(routes.schedule_event(req, Response(), x_profile="sample", x_admin_token="wrong",
+                                          x_request_id=None))
+    assert rejected.value.status_code == 403
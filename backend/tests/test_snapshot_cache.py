@@ -0,0 +1,118 @@
+import pytest
+from fastapi import HTTPException
+
+from api.schedule import snapshot_cache
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_cache, "SNAPSHOT_DIR", tmp_path)
+    return tmp_path
+
+
+def schedule_rows():
+    batches = [
+        {
+            "id": 12, "schedule_summary_id": 3, "batch_name": "Batch 2", "batch_number": 2,
+            "batch_date": "2026-01-05", "time_slot": "09:00 - 10:00", "room": "101",
+            "is_first_floor": True, "participant_count": 2, "participant_ids": [5, 6],
+            "has_pwd": False, "created_at": "2026-01-01T00:00:00+00:00",
+        },
+        {
+            "id": 11, "schedule_summary_id": 3, "batch_name": "Batch 1", "batch_number": 1,
+            "batch_date": "2026-01-05", "time_slot": "08:00 - 09:00", "room": "101",
+            "is_first_floor": True, "participant_count": 0, "participant_ids": [],
+            "has_pwd": False, "created_at": None,
+        },
+    ]
+    assignments = [
+        {"id": 21 + i, "schedule_summary_id": 3, "schedule_batch_id": 12, "participant_id": pid,
+         "seat_no": i + 1, "is_pwd": pid == 6, "extra": {"note": "x"} if i else None}
+        for i, pid in enumerate([5, 6])
+    ]
+    return {"schedule_batches": batches, "schedule_assignments": assignments}
+
+
+def test_round_trip_keeps_rows_as_written():
+    tables = schedule_rows()
+    snapshot_cache.write(3, tables)
+
+    snapshot = snapshot_cache.load(3)
+    assert snapshot is not None
+    for table, rows in tables.items():
+        expected = sorted(rows, key=lambda row: row["id"])
+        assert snapshot.rows(table) == expected
+        assert [list(row) for row in snapshot.rows(table)] == [list(row) for row in expected]
+        assert snapshot.version(table) == snapshot_cache.table_version(rows)
+
+
+def test_version_detects_deleted_rows():
+    tables = schedule_rows()
+    snapshot_cache.write(3, tables)
+    remaining = tables["schedule_assignments"][1:]
+    assert snapshot_cache.load(3).version("schedule_assignments") != snapshot_cache.table_version(remaining)
+
+
+def test_miss_evict_and_format_change(snapshot_dir):
+    assert snapshot_cache.load(3) is None
+
+    snapshot_cache.write(3, schedule_rows())
+    snapshot_cache.evict(3)
+    assert snapshot_cache.load(3) is None
+
+    snapshot_cache.write(3, schedule_rows())
+    meta = snapshot_dir / "3" / "meta.json"
+    meta.write_text(meta.read_text().replace(f'"version": {snapshot_cache.FORMAT_VERSION}', '"version": 0', 1))
+    assert snapshot_cache.load(3) is None
+
+
+def test_size_cap_evicts_least_recently_read(monkeypatch):
+    snapshot_cache.write(1, schedule_rows())
+    snapshot_cache.write(2, schedule_rows())
+    monkeypatch.setattr(snapshot_cache, "SNAPSHOT_MAX_MB", 0)
+    snapshot_cache.write(3, schedule_rows())
+    assert snapshot_cache.load(1) is None
+    assert snapshot_cache.load(2) is None
+
+
+@pytest.fixture
+def generated(routes, seeded, schedule_request):
+    """A persisted schedule with its snapshot written by the run"""
+    result = routes.run_schedule(routes.ScheduleRequest(**schedule_request(end_date="2026-01-05")))
+    seeded.calls.clear()
+    return result.schedule_summary_id
+
+
+def test_cache_hit_costs_only_the_version_queries(routes, seeded, generated):
+    schedule = routes.get_schedule(generated)
+
+    assert schedule["source"] == "cache"
+    assert len(schedule["assignments"]) == 60
+    assert sorted(seeded.calls) == [("schedule_assignments", "select"), ("schedule_batches", "select")]
+
+
+def test_batches_only_read(routes, seeded, generated):
+    schedule = routes.get_schedule_batches(generated)
+
+    assert schedule["source"] == "cache" and "assignments" not in schedule
+    assert schedule["batches"] == seeded.rows("schedule_batches", schedule_summary_id=generated)
+    assert seeded.calls == [("schedule_batches", "select")]
+
+
+def test_changed_schedule_is_read_from_the_database(routes, seeded, generated):
+    seeded.tables["schedule_assignments"].pop()
+    schedule = routes.get_schedule(generated)
+
+    assert schedule["source"] == "database"
+    assert len(schedule["assignments"]) == 59
+    assert routes.get_schedule(generated)["source"] == "cache"
+
+
+def test_deleted_schedule_is_not_served_from_its_snapshot(routes, seeded, generated):
+    for table in ("schedule_assignments", "schedule_batches", "schedule_summary"):
+        seeded.tables[table].clear()
+    with pytest.raises(HTTPException) as missing:
+        routes.get_schedule(generated)
+
+    assert missing.value.status_code == 404
+    assert snapshot_cache.load(generated) is None
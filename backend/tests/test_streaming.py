@@ -0,0 +1,120 @@
+import queue
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+
+def test_prefetch_yields_everything_in_order(routes):
+    assert list(routes.prefetch(iter(range(50)), maxsize=2)) == list(range(50))
+
+
+def test_prefetch_reraises_producer_errors(routes):
+    def pages():
+        yield 1
+        raise ValueError("page 2 failed")
+
+    stream = routes.prefetch(pages(), maxsize=1)
+    assert next(stream) == 1
+    with pytest.raises(ValueError, match="page 2 failed"):
+        next(stream)
+
+
+def test_closing_prefetch_stops_the_producer(routes):
+    produced = []
+
+    def pages():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    stream = routes.prefetch(pages(), maxsize=1)
+    next(stream)
+    stream.close()
+    for thread in threading.enumerate():
+        if thread.name == "schedule-prefetch":
+            thread.join(timeout=2)
+    assert len(produced) < 10
+
+
+def test_stream_writer_flushes_in_groups_and_drains_after_a_failure(routes, fake_sb, monkeypatch):
+    monkeypatch.setattr(routes, "STREAM_FLUSH_BATCHES", 2)
+    fake_sb.failures[("schedule_batches", "insert")] = RuntimeError("insert failed")
+    inbox = queue.Queue()
+    for number in range(1, 6):
+        batch = {"batch_number": number}
+        inbox.put((batch, [{"batch_number": number, "participant_id": number}]))
+    inbox.put(routes._STREAM_DONE)
+
+    stats = {"batches": 0, "failed_chunks": 0, "failed_batches": 0}
+    routes._stream_writer(7, inbox, stats)
+
+    assert stats == {"batches": 0, "failed_chunks": 0, "failed_batches": 5}
+    assert inbox.empty()
+    assert fake_sb.calls.count(("schedule_batches", "insert")) == 3
+
+
+def test_streaming_run_persists_every_batch(routes, seeded, schedule_request):
+    req = routes.ScheduleRequest(**schedule_request(streaming=True))
+    result = routes.run_schedule(req)
+
+    assert result.scheduled_count == 60
+    summary = seeded.rows("schedule_summary")[0]
+    assert summary["scheduled_count"] == 60
+    assert len(seeded.rows("schedule_batches", schedule_summary_id=summary["id"])) == result.total_batches
+    assert len(seeded.rows("schedule_assignments", schedule_summary_id=summary["id"])) == 60
+    assert routes.occupancy_index.summary_ids() == {summary["id"]}
+
+
+@pytest.mark.parametrize("table", ["schedule_batches", "schedule_assignments"])
+def test_failed_streaming_writes_roll_the_run_back(routes, seeded, schedule_request, table):
+    seeded.failures[(table, "insert")] = RuntimeError("insert failed")
+    req = routes.ScheduleRequest(**schedule_request(streaming=True))
+
+    with pytest.raises(HTTPException) as failed:
+        routes.run_schedule(req)
+
+    assert failed.value.status_code == 500
+    for name in ("schedule_summary", "schedule_batches", "schedule_assignments"):
+        assert not seeded.rows(name)
+    assert len(routes.occupancy_index) == 0
+
+
+def test_streaming_run_does_not_hold_the_booking_lock_while_fetching(routes, seeded, schedule_request):
+    lock_free = []
+    table = seeded.table
+
+    def probing_table(name):
+        if name == "participants" and threading.current_thread().name == "schedule-prefetch":
+            acquired = routes.booking_lock.acquire(timeout=1)
+            lock_free.append(acquired)
+            if acquired:
+                routes.booking_lock.release()
+        return table(name)
+
+    seeded.table = probing_table
+    routes.run_schedule(routes.ScheduleRequest(**schedule_request(streaming=True)))
+    assert lock_free and all(lock_free)
+
+
+def test_streaming_claims_skip_seats_booked_meanwhile(routes, seeded, schedule_request):
+    req = routes.ScheduleRequest(**schedule_request(streaming=True, end_date="2026-01-06"))
+    index = routes.occupancy_index
+    taken = {"campus": "Main", "building": "A", "room": "101", "batch_date": "2026-01-05",
+             "start_time": "08:00", "end_time": "09:00", "participant_count": 10}
+    table = seeded.table
+
+    def booking_table(name):
+        # Another run books room 101's first slot after this run built its ledger
+        if name == "participants" and threading.current_thread().name == "schedule-prefetch" and not len(index):
+            index.reserve([taken])
+        return table(name)
+
+    seeded.table = booking_table
+    result = routes.run_schedule(req)
+    assert result.scheduled_count == 60
+
+    batches = seeded.rows("schedule_batches")
+    assert not [b for b in batches if b["room"] == "101" and b["batch_date"] == "2026-01-05"
+                and b["start_time"] == "08:00"]
+    assert result.scheduled_count == sum(b["participant_count"] for b in batches)
@@ -24,6 +24,7 @@ import {
 const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!
 const supabaseAnonKey = process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!
 const supabase = createClient(supabaseUrl, supabaseAnonKey)
+const BACKEND_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
 
 interface Campus {
   name: string
@@ -157,6 +158,32 @@ async function fetchAllRows(table: string, filters: any = {}, orderBy: string =
   return allData
 }
 
+// Batches (by batch number) and assignments of a schedule. Served by the
+// backend (from its snapshot cache when current); falls back to paging Supabase.
+async function fetchScheduleRows(scheduleId: number) {
+  try {
+    const res = await fetch(`${BACKEND_URL}/api/schedule/schedules/${scheduleId}`, {
+      headers: { 'Accept': 'application/json' },
+      cache: 'no-store'
+    })
+    if (!res.ok) {
+      throw new Error(`Backend returned ${res.status}`)
+    }
+    const schedule = await res.json()
+    return {
+      batches: [...schedule.batches].sort((a: any, b: any) => a.batch_number - b.batch_number),
+      assignments: schedule.assignments
+    }
+  } catch (err) {
+    console.warn('⚠️ Backend schedule read failed, falling back to Supabase:', err)
+    const filters = { schedule_summary_id: scheduleId }
+    return {
+      batches: await fetchAllRows('schedule_batches', filters, 'batch_number'),
+      assignments: await fetchAllRows('schedule_assignments', filters)
+    }
+  }
+}
+
 // Get room capacities from campuses table
 async function getRoomCapacities(campusGroupId: number): Promise<Map<string, number>> {
   const { data, error } = await supabase
@@ -240,10 +267,8 @@ export default function ScheduleDetailsModal({ scheduleId, isOpen, onClose }: Sc
       // Fetch room capacities
       const roomCapacityMap = await getRoomCapacities(summaryData.campus_group_id)
 
-      // Fetch batches FIRST to get actual time slots
-      const batches = await fetchAllRows('schedule_batches', {
-        schedule_summary_id: scheduleId
-      }, 'batch_number')
+      // Fetch batches and assignments; batches give the actual time slots
+      const { batches, assignments } = await fetchScheduleRows(scheduleId)
 
       console.log(`✅ Fetched ${batches.length} batches`)
 
@@ -279,11 +304,6 @@ export default function ScheduleDetailsModal({ scheduleId, isOpen, onClose }: Sc
         console.log(`   Slot ${idx + 1}: ${slot.timeRange} - ${slot.participantCount} participants in ${slot.batchCount} batches`)
       })
 
-      // Fetch assignments
-      const assignments = await fetchAllRows('schedule_assignments', {
-        schedule_summary_id: scheduleId
-      })
-
       console.log(`✅ Fetched ${assignments.length} assignments`)
 
       // Fetch participants
@@ -1,6 +1,8 @@
 import { NextRequest, NextResponse } from 'next/server'
 import { supabase } from '@/lib/supabaseClient'
 
+const BACKEND_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+
 // Helper function to fetch ALL rows (bypass 1000 limit)
 async function fetchAllRows(table: string, filters: any = {}) {
   const PAGE_SIZE = 1000
@@ -55,6 +57,33 @@ async function fetchAllRows(table: string, filters: any = {}) {
   return allData
 }
 
+// Assignments and batches of a schedule, both ordered by id. Served by the
+// backend (from its snapshot cache when current); falls back to paging Supabase.
+async function fetchScheduleRows(scheduleId: number) {
+  try {
+    const res = await fetch(`${BACKEND_URL}/api/schedule/schedules/${scheduleId}`, {
+      headers: { 'Accept': 'application/json' },
+      cache: 'no-store'
+    })
+    if (res.status === 404) {
+      return { assignments: [], batches: [] }
+    }
+    if (!res.ok) {
+      throw new Error(`Backend returned ${res.status}`)
+    }
+    const schedule = await res.json()
+    console.log(`✅ Schedule ${scheduleId} read from backend (${schedule.source})`)
+    return { assignments: schedule.assignments, batches: schedule.batches }
+  } catch (err) {
+    console.warn('⚠️ Backend schedule read failed, falling back to Supabase:', err)
+    const filters = { schedule_summary_id: scheduleId }
+    return {
+      assignments: await fetchAllRows('schedule_assignments', filters),
+      batches: await fetchAllRows('schedule_batches', filters)
+    }
+  }
+}
+
 export async function GET(
   request: NextRequest,
   { params }: { params: Promise<{ id: string }> }
@@ -66,10 +95,8 @@ export async function GET(
 
     console.log(`\n📥 Export schedule ${scheduleId}`)
 
-    // ✅ Fetch ALL assignments (not limited to 1000)
-    const assignments = await fetchAllRows('schedule_assignments', {
-      schedule_summary_id: scheduleId
-    })
+    // ✅ Fetch ALL assignments and batches (not limited to 1000)
+    const { assignments, batches } = await fetchScheduleRows(scheduleId)
 
     console.log(`Found ${assignments.length} assignments`)
 
@@ -99,11 +126,6 @@ export async function GET(
 
     console.log(`Fetched ${participants.length} participants`)
 
-    // ✅ Fetch ALL batches
-    const batches = await fetchAllRows('schedule_batches', {
-      schedule_summary_id: scheduleId
-    })
-
     console.log(`Fetched ${batches.length} batches`)
 
     // Create lookup maps
@@ -6,8 +6,27 @@ const SUPABASE_KEY = process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY
 
 export const dynamic = 'force-dynamic'
 
-// Helper to fetch schedule_batches from Supabase, selecting all columns as per SQL schema
+// Helper to fetch schedule_batches from the backend, which serves them from its
+// snapshot cache; falls back to reading Supabase directly
 async function fetchScheduleBatches(scheduleSummaryId: number) {
+  try {
+    const res = await fetch(`${BACKEND_URL}/api/schedule/schedules/${scheduleSummaryId}/batches`, {
+      headers: { 'Accept': 'application/json' },
+      cache: 'no-store'
+    })
+    if (!res.ok) {
+      throw new Error(`Backend returned ${res.status}`)
+    }
+    const schedule = await res.json()
+    return [...schedule.batches].sort((a: any, b: any) => a.batch_number - b.batch_number)
+  } catch (err) {
+    console.warn('⚠️ Backend schedule read failed, falling back to Supabase:', err)
+    return await fetchScheduleBatchesFromSupabase(scheduleSummaryId)
+  }
+}
+
+// Helper to fetch schedule_batches from Supabase, selecting all columns as per SQL schema
+async function fetchScheduleBatchesFromSupabase(scheduleSummaryId: number) {
   if (!SUPABASE_URL || !SUPABASE_KEY) {
     throw new Error('Supabase environment variables not set')
   }
@@ -6,6 +6,34 @@ const supabase = createClient(
   process.env.NEXT_PUBLIC_SUPABASE_URL!,
   process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!
 )
+const BACKEND_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+
+// Batches of a schedule, served by the backend (from its snapshot cache when
+// current); falls back to Supabase if the backend cannot be reached.
+async function fetchScheduleBatches(scheduleSummaryId: number) {
+  try {
+    const res = await fetch(`${BACKEND_URL}/api/schedule/schedules/${scheduleSummaryId}/batches`, {
+      headers: { 'Accept': 'application/json' },
+      cache: 'no-store'
+    })
+    if (res.status === 404) {
+      return { batches: [] as any[], error: null }
+    }
+    if (!res.ok) {
+      throw new Error(`Backend returned ${res.status}`)
+    }
+    const schedule = await res.json()
+    console.log(`✅ Batches read from backend (${schedule.source})`)
+    return { batches: schedule.batches as any[], error: null }
+  } catch (err) {
+    console.warn('⚠️ Backend schedule read failed, falling back to Supabase:', err)
+    const { data, error } = await supabase
+      .from('schedule_batches')
+      .select('*')
+      .eq('schedule_summary_id', scheduleSummaryId)
+    return { batches: data, error }
+  }
+}
 
 export async function POST(req: NextRequest) {
   console.log('\n' + '='.repeat(80))
@@ -27,11 +55,8 @@ export async function POST(req: NextRequest) {
     }
 
     // Fetch batches
-    console.log('\n📊 Fetching schedule_batches from Supabase...')
-    const { data: batches, error: batchError } = await supabase
-      .from('schedule_batches')
-      .select('*')
-      .eq('schedule_summary_id', schedule_summary_id)
+    console.log('\n📊 Fetching schedule_batches...')
+    const { batches, error: batchError } = await fetchScheduleBatches(schedule_summary_id)
 
     if (batchError) {
       console.error(`❌ Batch fetch error: ${batchError.message}`)